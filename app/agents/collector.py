@@ -1,49 +1,75 @@
-import httpx
-from bs4 import BeautifulSoup
 from app.models import CollectorData
 import logging
-from googlesearch import search
+from app.utils import cassette, deadline, timing
+from app.utils.http import get_client
+from app.utils.normalization import normalize_input
+from app import cache, scheduler
+from app.agents import crawler
 import asyncio
+import os
 
 logger = logging.getLogger(__name__)
 
+# Upstream endpoints (overridable for local stubs / benchmarks)
+COINGECKO_API_URL = os.getenv("COINGECKO_API_URL", "https://api.coingecko.com/api/v3")
+APTOS_NODE_URL = os.getenv("APTOS_NODE_URL", "https://fullnode.testnet.aptoslabs.com/v1")
+# Optional JSON search backend ({"results": [...]}); falls back to googlesearch when unset
+SEARCH_API_URL = os.getenv("SEARCH_API_URL")
+
+# Shared across workers; short enough that market numbers stay current
+COLLECTOR_CACHE_TTL = float(os.getenv("COLLECTOR_CACHE_TTL", "300"))
+
+# Fractions of the remaining request budget; the rest is kept for the agents
+SCRAPE_BUDGET_SHARE = 0.3
+EXTRAS_BUDGET_SHARE = 0.5
+COLLECTOR_SOURCES = ["scrape", "market", "on_chain", "social", "docs"]
+STRUCTURE_TAGS = ["header", "nav", "section", "footer", "h1", "h2", "h3", "form", "button", "img", "a", "ul", "table"]
+MAX_STRUCTURE_CHARS = 2000
+
 # --- Helper Functions ---
 
+async def search_coin_id(client, query: str):
+    """
+    Resolves a project name to its CoinGecko id (None if not listed).
+    """
+    resp = await client.get(f"{COINGECKO_API_URL}/search", params={"query": query})
+    if resp.status_code == 200:
+        results = resp.json().get("coins", [])
+        if results:
+            return results[0]["id"]
+    return None
+
 async def collect_market_data(query: str):
     """
     Search CoinGecko for the project.
     """
     try:
-        async with httpx.AsyncClient() as client:
-            # 1. Search for ID
-            search_url = f"https://api.coingecko.com/api/v3/search?query={query}"
-            resp = await client.get(search_url)
-            if resp.status_code == 200:
-                results = resp.json().get("coins", [])
-                if results:
-                    coin_id = results[0]["id"]
-                    # 2. Get Price Data
-                    param_str = "localization=false&tickers=false&market_data=true&community_data=false&developer_data=false&sparkline=false"
-                    coin_url = f"https://api.coingecko.com/api/v3/coins/{coin_id}?{param_str}"
-                    price_resp = await client.get(coin_url)
-                    
-                    if price_resp.status_code == 200:
-                        data = price_resp.json()
-                        md = data.get("market_data", {})
-                        
-                        return {
-                            "coingecko_id": data.get("id"),
-                            "symbol": data.get("symbol", "").upper(),
-                            "price_usd": md.get("current_price", {}).get("usd", 0),
-                            "market_cap": md.get("market_cap", {}).get("usd", 0),
-                            "vol_24h": md.get("total_volume", {}).get("usd", 0),
-                            "change_24h": md.get("price_change_percentage_24h", 0),
-                            "ath": md.get("ath", {}).get("usd", 0),
-                            "atl": md.get("atl", {}).get("usd", 0),
-                            "fdv": md.get("fully_diluted_valuation", {}).get("usd", 0),
-                            "total_supply": md.get("total_supply", 0),
-                            "circ_supply": md.get("circulating_supply", 0)
-                        }
+        client = get_client()
+        # 1. Search for ID
+        coin_id = await search_coin_id(client, query)
+        if coin_id:
+            # 2. Get Price Data
+            param_str = "localization=false&tickers=false&market_data=true&community_data=false&developer_data=false&sparkline=false"
+            coin_url = f"{COINGECKO_API_URL}/coins/{coin_id}?{param_str}"
+            price_resp = await client.get(coin_url)
+            
+            if price_resp.status_code == 200:
+                data = price_resp.json()
+                md = data.get("market_data", {})
+                
+                return {
+                    "coingecko_id": data.get("id"),
+                    "symbol": data.get("symbol", "").upper(),
+                    "price_usd": md.get("current_price", {}).get("usd", 0),
+                    "market_cap": md.get("market_cap", {}).get("usd", 0),
+                    "vol_24h": md.get("total_volume", {}).get("usd", 0),
+                    "change_24h": md.get("price_change_percentage_24h", 0),
+                    "ath": md.get("ath", {}).get("usd", 0),
+                    "atl": md.get("atl", {}).get("usd", 0),
+                    "fdv": md.get("fully_diluted_valuation", {}).get("usd", 0),
+                    "total_supply": md.get("total_supply", 0),
+                    "circ_supply": md.get("circulating_supply", 0)
+                }
     except Exception as e:
         logger.warning(f"CoinGecko failed: {e}")
     return None
@@ -54,20 +80,18 @@ async def collect_on_chain_data(input_str: str):
     """
     if str(input_str).startswith("0x") and len(input_str) > 60:
         try:
-            node_url = "https://fullnode.testnet.aptoslabs.com/v1"
-            async with httpx.AsyncClient() as client:
-                # Get Resources
-                url = f"{node_url}/accounts/{input_str}/resources"
-                resp = await client.get(url)
-                if resp.status_code == 200:
-                    resources = resp.json()
-                    # Summary
-                    modules = [r["type"] for r in resources if "0x1::" not in r["type"]]
-                    return {
-                        "is_contract": len(modules) > 0,
-                        "modules_count": len(modules),
-                        "balance_apt": "Checked via CoinStore" # Simplified
-                    }
+            # Get Resources
+            url = f"{APTOS_NODE_URL}/accounts/{input_str}/resources"
+            resp = await get_client().get(url)
+            if resp.status_code == 200:
+                resources = resp.json()
+                # Summary
+                modules = [r["type"] for r in resources if "0x1::" not in r["type"]]
+                return {
+                    "is_contract": len(modules) > 0,
+                    "modules_count": len(modules),
+                    "balance_apt": "Checked via CoinStore" # Simplified
+                }
         except Exception as e:
             logger.warning(f"Aptos Node failed: {e}")
     return None
@@ -81,14 +105,57 @@ async def collect_social_signals(query: str):
         # Sync wrapper for google search (it's blocking)
         # We search specifically for negative signals or social proof
         search_query = f"{query} crypto scam reddit twitter"
+        if SEARCH_API_URL:
+            resp = await get_client().get(SEARCH_API_URL, params={"q": search_query, "num": 5})
+            if resp.status_code == 200:
+                signals = resp.json().get("results", [])[:5]
+            return signals
         # Run in thread executor locally
+        from googlesearch import search
         loop = asyncio.get_event_loop()
-        results = await loop.run_in_executor(None, lambda: list(search(search_query, num_results=5, lang="en")))
+        results = await cassette.call("googlesearch", search_query, lambda: loop.run_in_executor(
+            scheduler.social_executor(), lambda: list(search(search_query, num_results=5, lang="en"))
+        ))
         signals = results
     except Exception as e:
         logger.warning(f"Search failed: {e}")
     return signals
 
+async def scrape_page(url: str) -> dict:
+    """
+    Fetches a landing page and extracts title, visible text and docs presence.
+    """
+    try:
+        resp = await get_client().get(url, follow_redirects=True, timeout=10.0)
+
+        if resp.status_code != 200:
+            return {"ok": False, "title": "", "text": f"Failed to load page: HTTP {resp.status_code}", "docs_present": False}
+
+        from bs4 import BeautifulSoup
+        soup = BeautifulSoup(resp.text, 'html.parser')
+        title_tag = soup.find('title')
+        title = title_tag.string if title_tag and title_tag.string else url
+
+        # Docs/whitepaper/audit/GitHub links (nav and footer included, so before cleanup)
+        anchors = [(a.get("href"), a.get_text(" ", strip=True)) for a in soup.find_all("a", href=True)]
+        doc_links = crawler.find_doc_links(str(resp.url), anchors)
+
+        # Tag sequence of the page layout (used for near-duplicate detection)
+        structure = " ".join(tag.name for tag in soup.find_all(STRUCTURE_TAGS))[:MAX_STRUCTURE_CHARS]
+
+        # Cleanup
+        for script in soup(["script", "style", "nav", "footer"]):
+            script.extract()
+        raw_text = soup.get_text(separator=' ', strip=True)
+
+        lower_text = raw_text.lower()
+        docs_present = "docs" in lower_text or "whitepaper" in lower_text
+        return {"ok": True, "title": title, "text": raw_text, "docs_present": docs_present, "structure": structure, "doc_links": doc_links}
+
+    except Exception as e:
+        logger.error(f"Scraping failed: {e}")
+        return {"ok": False, "title": "Analysis Failed", "text": f"Scraping error: {str(e)}", "docs_present": False}
+
 # --- Main Collector ---
 
 async def collect_data(url_or_input: str, project_type: str) -> CollectorData:
@@ -96,6 +163,8 @@ async def collect_data(url_or_input: str, project_type: str) -> CollectorData:
     Orchestrates collection from Web, Market, Chain, and Socials.
     """
     raw_text = ""
+    structure = ""
+    doc_links = []
     title = ""
     docs_present = False
     contracts_found = False
@@ -111,55 +180,88 @@ async def collect_data(url_or_input: str, project_type: str) -> CollectorData:
     
     # 2. Web Scraping (if URL)
     if is_url:
-        try:
-            async with httpx.AsyncClient(follow_redirects=True, timeout=10.0) as client:
-                resp = await client.get(url_or_input)
-                
-            if resp.status_code == 200:
-                soup = BeautifulSoup(resp.text, 'html.parser')
-                title_tag = soup.find('title')
-                title = title_tag.string if title_tag else url_or_input
+        with timing.stage("scrape"):
+            page = await deadline.run_stage("scrape", scrape_page(url_or_input), None, share=SCRAPE_BUDGET_SHARE)
+        if page:
+            title = page["title"]
+            raw_text = page["text"]
+            structure = page.get("structure", "")
+            doc_links = page.get("doc_links", [])
+            docs_present = page["docs_present"]
+            if page["ok"]:
                 search_term = title # Use title for other searches
-                
-                # Cleanup
-                for script in soup(["script", "style", "nav", "footer"]):
-                    script.extract()
-                raw_text = soup.get_text(separator=' ', strip=True)
-                
-                lower_text = raw_text.lower()
-                if "docs" in lower_text or "whitepaper" in lower_text:
-                    docs_present = True
-            else:
-                raw_text = f"Failed to load page: HTTP {resp.status_code}"
-
-        except Exception as e:
-            logger.error(f"Scraping failed: {e}")
-            raw_text = f"Scraping error: {str(e)}"
-            title = "Analysis Failed"
+        else:
+            title = url_or_input
     else:
         title = url_or_input # It's a name or address
 
-    # 3. Parallel Fetching for Extras
-    # If it's a Token project, check Market
-    if "Token" in project_type or "Coin" in project_type:
-        market_data = await collect_market_data(search_term)
+    # 3. Parallel Fetching for Extras (each bounded by its share of the request budget)
+    async def market():
+        # If it's a Token project, check Market
+        if "Token" in project_type or "Coin" in project_type:
+            with timing.stage("market"):
+                return await deadline.run_stage("market", collect_market_data(search_term), None, share=EXTRAS_BUDGET_SHARE)
+        return None
 
-    # 4. On-Chain Check
-    if is_address:
-        on_chain_data = await collect_on_chain_data(url_or_input)
-        contracts_found = on_chain_data.get("is_contract", False) if on_chain_data else False
-    
-    # 5. Social Search (All)
-    social_signals = await collect_social_signals(search_term)
+    async def on_chain():
+        # 4. On-Chain Check
+        if is_address:
+            with timing.stage("on_chain"):
+                return await deadline.run_stage("on_chain", collect_on_chain_data(url_or_input), None, share=EXTRAS_BUDGET_SHARE)
+        return None
+
+    async def social():
+        # 5. Social Search (All)
+        with timing.stage("social"):
+            return await deadline.run_stage("social", collect_social_signals(search_term), [], share=EXTRAS_BUDGET_SHARE)
 
-    # 6. Aggregate
+    async def docs():
+        # 6. Bounded crawl of linked docs, whitepaper, audits and GitHub
+        if not doc_links:
+            return None
+        with timing.stage("docs"):
+            return await deadline.run_stage("docs", crawler.crawl(doc_links), None, share=EXTRAS_BUDGET_SHARE)
+
+    market_data, on_chain_data, social_signals, docs_signals = await asyncio.gather(market(), on_chain(), social(), docs())
+    contracts_found = on_chain_data.get("is_contract", False) if on_chain_data else False
+
+    # Documentation counts only if it was actually fetched; the landing-page keyword
+    # check remains as a fallback when the crawl ran out of time
+    if docs_signals is not None:
+        docs_present = docs_signals["docs_fetched"]
+    elif is_url and page and page["ok"] and not doc_links:
+        docs_present = False
+
+    # Sources that ran out of time (their defaults above stand in)
+    current = deadline.current()
+    degraded = [name for name in COLLECTOR_SOURCES if current and name in current.outcomes]
+
+    # 7. Aggregate
     return CollectorData(
         project_name=str(title)[:50],
         domain_age="Auto-Detected",
         contracts_found=contracts_found,
         docs_present=docs_present,
-        raw_signals={"text_content": raw_text[:3000]},
+        raw_signals={"text_content": raw_text[:3000], "structure": structure},
         market_data=market_data,
         on_chain_data=on_chain_data,
-        social_signals=social_signals
+        social_signals=social_signals,
+        docs=docs_signals,
+        degraded_sources=degraded
+    )
+
+async def collect_data_cached(url_or_input: str, project_type: str) -> CollectorData:
+    """
+    collect_data through the shared cache (one upstream fan-out per project across workers).
+    """
+    key = f"{normalize_input(url_or_input)}|{project_type}"
+
+    async def compute():
+        return (await collect_data(url_or_input, project_type)).model_dump()
+
+    # Partial results (a source timed out) are shared with concurrent callers but not cached
+    value = await cache.get_or_compute(
+        "collector", key, COLLECTOR_CACHE_TTL, compute,
+        cache_if=lambda v: not v.get("degraded_sources")
     )
+    return CollectorData(**value)
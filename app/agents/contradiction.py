@@ -3,6 +3,8 @@ from app import llm
 from typing import Optional
 import json
 
+FALLBACK_REASON = "Contradiction check unavailable (AI error)"
+
 SYSTEM_PROMPT = """
 You are a Contradiction Agent. 
 Compare the Deterministic Rule Results against the AI Agent Analysis.
@@ -31,4 +33,4 @@ async def detect_conflict(rules: list[RuleResult], risk: RiskAnalysis, cred: Cre
     except:
         pass
     
-    return {"has_conflict": False, "reason": ""}
+    return {"has_conflict": False, "reason": FALLBACK_REASON}
@@ -0,0 +1,319 @@
+"""
+Bounded crawl of the documentation linked from a landing page.
+
+Docs, whitepaper, audit and GitHub links are fetched concurrently with a cap
+on the number of pages, a per-host concurrency limit (shared by all requests
+in the worker) and a total byte budget, then reduced to compact signals for
+the rules and agents: audit firm mentions, token allocation, vesting and
+repository activity. Links (and redirects) to loopback, link-local, private
+or otherwise non-public addresses are not fetched.
+"""
+import asyncio
+import ipaddress
+import json
+import logging
+import os
+import re
+import socket
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+from app.utils import cassette
+from app.utils.http import get_client
+
+logger = logging.getLogger(__name__)
+
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com")
+
+CRAWL_MAX_PAGES = int(os.getenv("CRAWL_MAX_PAGES", "6"))
+CRAWL_MAX_PER_KIND = 2
+CRAWL_CONCURRENCY = int(os.getenv("CRAWL_CONCURRENCY", "4"))
+CRAWL_PER_HOST = int(os.getenv("CRAWL_PER_HOST", "2"))
+CRAWL_BYTE_BUDGET = int(os.getenv("CRAWL_BYTE_BUDGET", "1500000"))
+CRAWL_MAX_PAGE_BYTES = 500_000
+CRAWL_TIMEOUT = 5.0
+CRAWL_MAX_REDIRECTS = 3
+# Only for local stubs (benchmarks): allows crawling loopback and private addresses
+CRAWL_ALLOW_PRIVATE = os.getenv("CRAWL_ALLOW_PRIVATE", "0") == "1"
+MAX_TRACKED_HOSTS = 1024
+MIN_DOC_CHARS = 200 # Less text than this does not count as documentation
+MAX_EXCERPT_CHARS = 1500
+
+# Checked in this order; a link gets the first kind it matches
+DOC_KINDS = ["github", "audit", "whitepaper", "docs"]
+
+AUDIT_FIRMS = [
+    "CertiK", "OtterSec", "Zellic", "MoveBit", "Trail of Bits", "OpenZeppelin", "Halborn",
+    "Hacken", "PeckShield", "Quantstamp", "Spearbit", "Consensys Diligence", "SlowMist",
+    "Veridise", "Sherlock", "Code4rena", "Kudelski", "Hashlock", "BlockSec"
+]
+_AUDIT_FIRM_RE = re.compile("|".join(re.escape(f) for f in AUDIT_FIRMS), re.IGNORECASE)
+_FIRM_NAMES = {f.lower(): f for f in AUDIT_FIRMS}
+
+_ALLOCATION_CONTEXT = re.compile(r"allocation|tokenomics|distribution", re.IGNORECASE)
+_ALLOCATION_LINE = re.compile(r"([A-Za-z][A-Za-z &/()-]{2,40}?)\s*[:\-–]?\s*(\d{1,2}(?:\.\d+)?)\s?%")
+# Prose percentages only count with a short label naming a known allocation bucket
+# ("Team: 15%"), not any rate near the word "distribution" ("stakers earn up to 12%")
+_ALLOCATION_BUCKET = re.compile(
+    r"\b(team|founders?|advisors?|core contributors?|community|treasury|investors?|seed|"
+    r"(?:private|public|pre)[- ]?sales?|ecosystem|foundation|liquidity|airdrops?|reserves?|"
+    r"marketing|partners(?:hips?)?|development|dao|staking rewards|rewards|incentives)\b",
+    re.IGNORECASE
+)
+_LABEL_STOPWORDS = re.compile(r"^(?:(?:and|or|the|of|for|to|with)\b\s*)+", re.IGNORECASE)
+MAX_PROSE_LABEL_WORDS = 3
+_TEAM_LABEL = re.compile(r"team|founder|core contributor|advisor", re.IGNORECASE)
+_VESTING = re.compile(r"vesting|cliff|lock-?up|unlock schedule", re.IGNORECASE)
+MAX_ALLOCATION_ENTRIES = 12
+
+class BlockedURL(ValueError):
+    """
+    A crawl target that resolves to a non-public address.
+    """
+
+class _HostLimits:
+    """
+    Per-host politeness across all requests in this worker. Keeps at most
+    MAX_TRACKED_HOSTS hosts; the least recently used idle ones are dropped first.
+    """
+    def __init__(self, per_host: int, max_hosts: int):
+        self.per_host = per_host
+        self.max_hosts = max_hosts
+        self._hosts: "OrderedDict[str, list]" = OrderedDict() # host -> [semaphore, users]
+
+    @asynccontextmanager
+    async def hold(self, host: str):
+        entry = self._hosts.get(host)
+        if entry is None:
+            self._evict() # Before adding, so the new host is never the one dropped
+            entry = self._hosts[host] = [asyncio.Semaphore(self.per_host), 0]
+        self._hosts.move_to_end(host)
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+
+    def _evict(self):
+        # Makes room for one more host. Hosts with requests running or waiting keep
+        # their semaphore, so the map can briefly exceed max_hosts when all are busy
+        for host in list(self._hosts):
+            if len(self._hosts) < self.max_hosts:
+                break
+            if self._hosts[host][1] == 0:
+                del self._hosts[host]
+
+    def __len__(self) -> int:
+        return len(self._hosts)
+
+_host_limits = _HostLimits(CRAWL_PER_HOST, MAX_TRACKED_HOSTS)
+
+def classify_link(href: str, text: str) -> Optional[str]:
+    parts = urlsplit(href)
+    host = parts.netloc.lower()
+    haystack = f"{href} {text}".lower()
+    if host in ("github.com", "www.github.com") and len([p for p in parts.path.split("/") if p]) >= 2:
+        return "github"
+    if "audit" in haystack:
+        return "audit"
+    if "whitepaper" in haystack or "litepaper" in haystack or parts.path.lower().endswith(".pdf"):
+        return "whitepaper"
+    if "docs" in haystack or "documentation" in haystack or "gitbook" in host or host.startswith("docs."):
+        return "docs"
+    return None
+
+def find_doc_links(base_url: str, anchors: List[Tuple[str, str]]) -> List[dict]:
+    """
+    Picks crawlable links from (href, anchor text) pairs, at most CRAWL_MAX_PER_KIND per kind.
+    """
+    links, seen, per_kind = [], {base_url.rstrip("/")}, {}
+    for href, text in anchors:
+        url = urljoin(base_url, href or "").split("#")[0]
+        if not url.startswith(("http://", "https://")) or url.rstrip("/") in seen:
+            continue
+        kind = classify_link(url, text or "")
+        if not kind or per_kind.get(kind, 0) >= CRAWL_MAX_PER_KIND:
+            continue
+        seen.add(url.rstrip("/"))
+        per_kind[kind] = per_kind.get(kind, 0) + 1
+        links.append({"kind": kind, "url": url})
+    # Highest-signal kinds first when the page cap cuts the list
+    links.sort(key=lambda link: DOC_KINDS.index(link["kind"]))
+    return links[:CRAWL_MAX_PAGES]
+
+def _github_api_url(url: str) -> str:
+    owner, repo = [p for p in urlsplit(url).path.split("/") if p][:2]
+    return f"{GITHUB_API_URL}/repos/{owner}/{repo.removesuffix('.git')}"
+
+class _Budget:
+    def __init__(self, total: int):
+        self.remaining = total
+
+    def take(self, size: int) -> int:
+        granted = min(size, self.remaining)
+        self.remaining -= granted
+        return granted
+
+def _is_public(address: str) -> bool:
+    ip = ipaddress.ip_address(address.split("%")[0]) # Drop an IPv6 zone id
+    if ip.version == 6 and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+async def _check_public(url: str):
+    """
+    Raises BlockedURL unless every address `url`'s host resolves to is public.
+    """
+    if CRAWL_ALLOW_PRIVATE or cassette.UPSTREAM_MODE == cassette.REPLAY:
+        return # Replay never reaches the network
+    parts = urlsplit(url)
+    if not parts.hostname:
+        raise BlockedURL(f"No host in {url}")
+    try:
+        ipaddress.ip_address(parts.hostname.split("%")[0])
+        addresses = [parts.hostname]
+    except ValueError:
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        infos = await asyncio.get_running_loop().getaddrinfo(parts.hostname, port, type=socket.SOCK_STREAM)
+        addresses = [info[4][0] for info in infos]
+    if not addresses or not all(_is_public(a) for a in addresses):
+        raise BlockedURL(f"{parts.hostname} is not a public address")
+
+async def _fetch(url: str, budget: _Budget) -> Tuple[int, str, bytes]:
+    # Redirects are followed by hand so every hop is checked
+    for _ in range(CRAWL_MAX_REDIRECTS + 1):
+        await _check_public(url)
+        async with _host_limits.hold(urlsplit(url).netloc.lower()):
+            if budget.remaining <= 0:
+                return 0, "", b""
+            chunks, size = [], 0
+            async with get_client().stream("GET", url, follow_redirects=False, timeout=CRAWL_TIMEOUT) as resp:
+                if resp.is_redirect:
+                    url = urljoin(url, resp.headers["location"])
+                    continue
+                async for chunk in resp.aiter_bytes():
+                    granted = budget.take(min(len(chunk), CRAWL_MAX_PAGE_BYTES - size))
+                    chunks.append(chunk[:granted])
+                    size += granted
+                    if granted < len(chunk):
+                        break # Page cap or total budget reached: keep what we have
+                return resp.status_code, resp.headers.get("content-type", ""), b"".join(chunks)
+    raise ValueError(f"More than {CRAWL_MAX_REDIRECTS} redirects")
+
+def _html_text(body: bytes) -> Tuple[str, List[List[str]]]:
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(body, "html.parser")
+    rows = [[cell.get_text(" ", strip=True) for cell in tr.find_all(["td", "th"])] for tr in soup.find_all("tr")]
+    for tag in soup(["script", "style", "nav", "footer"]):
+        tag.extract()
+    return soup.get_text(separator=" ", strip=True), rows
+
+def extract_allocation(text: str, rows: List[List[str]]) -> Dict[str, float]:
+    allocation: Dict[str, float] = {}
+    # Tables: a label cell followed by a percentage cell
+    for cells in rows:
+        pct_cells = [c for c in cells[1:] if re.fullmatch(r"\d{1,2}(?:\.\d+)?\s?%", c)]
+        if cells and pct_cells and cells[0]:
+            allocation[cells[0][:40]] = float(pct_cells[0].rstrip("% "))
+    # Prose, only near allocation vocabulary
+    if not allocation and _ALLOCATION_CONTEXT.search(text):
+        for label, pct in _ALLOCATION_LINE.findall(text):
+            label = _LABEL_STOPWORDS.sub("", label.strip())
+            if len(label.split()) <= MAX_PROSE_LABEL_WORDS and _ALLOCATION_BUCKET.search(label):
+                allocation.setdefault(label, float(pct))
+    return dict(list(allocation.items())[:MAX_ALLOCATION_ENTRIES])
+
+def extract_signals(pages: List[dict]) -> dict:
+    """
+    Reduces fetched pages ({"kind", "url", "status", "text", "rows", "json"}) to compact signals.
+    """
+    ok = [p for p in pages if p["status"] == 200]
+    doc_text = " ".join(p["text"] for p in ok if p["kind"] in ("docs", "whitepaper", "audit"))
+
+    firms = sorted({_FIRM_NAMES[m.lower()] for p in ok for m in _AUDIT_FIRM_RE.findall(p["text"])})
+    allocation: Dict[str, float] = {}
+    for page in ok:
+        if page["kind"] != "github":
+            allocation.update({k: v for k, v in extract_allocation(page["text"], page["rows"]).items() if k not in allocation})
+    team = [pct for label, pct in allocation.items() if _TEAM_LABEL.search(label)]
+
+    github = None
+    for page in ok:
+        if page["kind"] == "github" and page.get("json"):
+            repo = page["json"]
+            github = {
+                "repo": repo.get("full_name"),
+                "stars": repo.get("stargazers_count", 0),
+                "archived": repo.get("archived", False),
+                "pushed_at": repo.get("pushed_at")
+            }
+            break
+
+    return {
+        "pages": [{"kind": p["kind"], "url": p["url"], "status": p["status"], "bytes": p["bytes"]} for p in pages],
+        "docs_fetched": any(
+            p["kind"] in ("docs", "whitepaper") and len(p["text"]) >= MIN_DOC_CHARS
+            or p["kind"] == "whitepaper" and not p["text"] and p["bytes"] >= MIN_DOC_CHARS # e.g. a PDF
+            for p in ok
+        ),
+        "whitepaper_fetched": any(p["kind"] == "whitepaper" for p in ok),
+        "audit_link": any(p["kind"] == "audit" for p in pages),
+        "audit_firms": firms,
+        "token_allocation": allocation,
+        "team_allocation_pct": round(sum(team), 2) if team else None,
+        "vesting_mentioned": bool(_VESTING.search(doc_text)),
+        "github": github,
+        "bytes_fetched": sum(p["bytes"] for p in pages),
+        "excerpt": doc_text[:MAX_EXCERPT_CHARS]
+    }
+
+def summarize(docs: dict) -> str:
+    """
+    Compact prompt context for the agents.
+    """
+    parts = [f"audit firms: {', '.join(docs['audit_firms']) or 'none named'}"]
+    if docs["token_allocation"]:
+        parts.append("token allocation: " + ", ".join(f"{k} {v:g}%" for k, v in docs["token_allocation"].items()))
+    parts.append(f"vesting mentioned: {docs['vesting_mentioned']}")
+    if docs["github"]:
+        gh = docs["github"]
+        parts.append(f"github: {gh['repo']} ({gh['stars']} stars, archived={gh['archived']}, last push {gh['pushed_at']})")
+    if docs["excerpt"]:
+        parts.append(f"docs excerpt: {docs['excerpt']}")
+    return "; ".join(parts)
+
+async def crawl(links: List[dict]) -> Optional[dict]:
+    """
+    Fetches `links` (from find_doc_links) within the page, host and byte limits.
+    None when there is nothing to crawl.
+    """
+    if not links:
+        return None
+    budget = _Budget(CRAWL_BYTE_BUDGET)
+    limit = asyncio.Semaphore(CRAWL_CONCURRENCY)
+
+    async def fetch_page(link: dict) -> dict:
+        page = {**link, "status": 0, "text": "", "rows": [], "json": None, "bytes": 0}
+        url = _github_api_url(link["url"]) if link["kind"] == "github" else link["url"]
+        try:
+            async with limit:
+                status, content_type, body = await _fetch(url, budget)
+            page.update(status=status, bytes=len(body))
+            if status != 200 or not body:
+                return page
+            if "json" in content_type:
+                page["json"] = json.loads(body)
+            elif "html" in content_type:
+                page["text"], page["rows"] = await asyncio.to_thread(_html_text, body)
+            elif content_type.startswith("text/"):
+                page["text"] = body.decode("utf-8", errors="replace")
+            # PDFs and other binaries only count as fetched
+        except Exception as e:
+            logger.warning(f"Crawl failed for {url}: {e}")
+        return page
+
+    pages = await asyncio.gather(*(fetch_page(link) for link in links))
+    return extract_signals(list(pages))
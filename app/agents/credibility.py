@@ -1,5 +1,7 @@
 from app.models import CollectorData, CredibilityAnalysis
 from app import llm
+from app.agents import crawler
+from typing import Optional
 import json
 import logging
 
@@ -21,7 +23,10 @@ Output valid JSON only:
 }
 """
 
-async def assess_credibility(data: CollectorData) -> CredibilityAnalysis:
+async def assess_credibility(data: CollectorData) -> Optional[CredibilityAnalysis]:
+    """
+    None when the LLM call fails; the caller substitutes its default (which is never stored).
+    """
     text_content = data.raw_signals.get("text_content", "")
     
     # Construct Context
@@ -30,6 +35,8 @@ async def assess_credibility(data: CollectorData) -> CredibilityAnalysis:
         context += f"Market Data (High Cap is credible): {data.market_data}\n"
     if data.social_signals:
         context += f"Social Search Results (Read for sentiment): {data.social_signals}\n"
+    if data.docs:
+        context += f"Documentation (crawled): {crawler.summarize(data.docs)}\n"
 
     if not text_content and not data.market_data and not data.social_signals:
         return CredibilityAnalysis(credibility_score=0.5, positive_signals=[])
@@ -45,5 +52,4 @@ async def assess_credibility(data: CollectorData) -> CredibilityAnalysis:
     except Exception as e:
         logger.error(f"Credibility Analysis failed: {e}")
 
-    # Fallback
-    return CredibilityAnalysis(credibility_score=0.5, positive_signals=[])
+    return None
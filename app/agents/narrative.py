@@ -2,6 +2,8 @@ from app.models import CollectorData, RuleResult
 from app import llm
 import json
 
+FALLBACK_NARRATIVE = "No narrative generated."
+
 SYSTEM_PROMPT = """
 You are a Narrative Structural Agent. 
 Your job is to convert raw data and hard rule results into a neutral, factual summary of a crypto project's market structure.
@@ -22,4 +24,4 @@ async def generate_narrative(data: CollectorData, rules: list[RuleResult]) -> st
     """
     
     narrative = await llm.get_text_completion(SYSTEM_PROMPT, context)
-    return narrative or "No narrative generated."
+    return narrative or FALLBACK_NARRATIVE
@@ -0,0 +1,100 @@
+import asyncio
+import logging
+import os
+from typing import Tuple
+
+from app import cache
+from app.agents import collector
+from app.models import PreCheckSignals
+from app.utils import deadline, timing
+from app.utils.http import get_client
+from app.utils.normalization import normalize_input
+
+logger = logging.getLogger(__name__)
+
+# Free-tier results are cheap to recompute but hit by most traffic
+PRECHECK_CACHE_TTL = float(os.getenv("PRECHECK_CACHE_TTL", "300"))
+PRECHECK_SOURCES = ["scrape", "market", "on_chain"]
+
+def is_market_type(project_type: str) -> bool:
+    return "Token" in project_type or "Coin" in project_type
+
+def build_pre_check(domain_age: str, docs_present: bool, contracts_found: bool, market_listed: bool) -> dict:
+    """
+    Frontend preCheck block, shared by the free and paid paths.
+    """
+    return {
+        "age": domain_age,
+        "liquidity": "Listed (CoinGecko)" if market_listed else "Unknown (Agent Stub)",
+        "socialMentions": "High" if docs_present else "Low",
+        "contractVerified": contracts_found
+    }
+
+async def check_market_listing(query: str) -> bool:
+    """
+    Search-only CoinGecko lookup (skips the full coin/market fetch).
+    """
+    try:
+        return await collector.search_coin_id(get_client(), query) is not None
+    except Exception as e:
+        logger.warning(f"CoinGecko search failed: {e}")
+    return False
+
+async def _scrape_and_list(url_or_input: str, project_type: str) -> Tuple[bool, bool]:
+    docs_present = False
+    search_term = url_or_input
+    if url_or_input.startswith("http"):
+        with timing.stage("scrape"):
+            page = await deadline.run_stage("scrape", collector.scrape_page(url_or_input), None)
+        if page:
+            docs_present = page["docs_present"]
+            if page["ok"]:
+                search_term = page["title"]
+
+    market_listed = False
+    if is_market_type(project_type):
+        with timing.stage("market"):
+            market_listed = await deadline.run_stage("market", check_market_listing(search_term), False)
+    return docs_present, market_listed
+
+async def _contract_presence(url_or_input: str) -> bool:
+    if not url_or_input.startswith("0x"):
+        return False
+    with timing.stage("on_chain"):
+        on_chain_data = await deadline.run_stage("on_chain", collector.collect_on_chain_data(url_or_input), None)
+    return bool(on_chain_data and on_chain_data.get("is_contract", False))
+
+async def _compute(url_or_input: str, project_type: str) -> PreCheckSignals:
+    # Never touches the social search or the CoinGecko coin endpoint
+    (docs_present, market_listed), contracts_found = await asyncio.gather(
+        _scrape_and_list(url_or_input, project_type),
+        _contract_presence(url_or_input),
+    )
+    current = deadline.current()
+    return PreCheckSignals(
+        domain_age="Auto-Detected",
+        docs_present=docs_present,
+        contracts_found=contracts_found,
+        market_listed=market_listed,
+        degraded_sources=[name for name in PRECHECK_SOURCES if current and name in current.outcomes]
+    )
+
+async def run_pre_check(url_or_input: str, project_type: str) -> dict:
+    """
+    Lightweight pipeline for the free path: docs, contract and market presence only.
+    Results live briefly in the shared cache and concurrent identical requests
+    (across workers too) share one computation.
+    """
+    key = f"{normalize_input(url_or_input)}|{project_type}"
+
+    async def compute():
+        return (await _compute(url_or_input, project_type)).model_dump()
+
+    # Partial results (a source timed out) are shared with concurrent callers but not cached
+    signals = PreCheckSignals(**await cache.get_or_compute(
+        "precheck", key, PRECHECK_CACHE_TTL, compute,
+        cache_if=lambda v: not v.get("degraded_sources")
+    ))
+    for source in signals.degraded_sources:
+        deadline.mark(source, deadline.TIMED_OUT)
+    return build_pre_check(signals.domain_age, signals.docs_present, signals.contracts_found, signals.market_listed)
@@ -1,10 +1,13 @@
 from app.models import CollectorData, RiskAnalysis
 from app import llm
+from app.agents import crawler
 import json
 import logging
 
 logger = logging.getLogger(__name__)
 
+FALLBACK_FLAG = "AI Analysis Error, manual review required"
+
 SYSTEM_PROMPT = """
 You are a blockchain risk verification agent. 
 Analyze the provided website text for a crypto project.
@@ -31,6 +34,8 @@ async def assess_risk(data: CollectorData) -> RiskAnalysis:
         context += f"Market Data (CoinGecko): {data.market_data}\n"
     if data.on_chain_data:
         context += f"On-Chain Data: {data.on_chain_data}\n"
+    if data.docs:
+        context += f"Documentation (crawled): {crawler.summarize(data.docs)}\n"
 
     # Allow processing if we have ANY data (Market or Chain), even if no text
     if not text_content and not data.market_data and not data.on_chain_data:
@@ -48,4 +53,4 @@ async def assess_risk(data: CollectorData) -> RiskAnalysis:
         logger.error(f"Risk Analysis failed: {e}")
     
     # Fallback
-    return RiskAnalysis(risk_score=0.5, risk_flags=["AI Analysis Error, manual review required"])
+    return RiskAnalysis(risk_score=0.5, risk_flags=[FALLBACK_FLAG])
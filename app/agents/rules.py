@@ -1,3 +1,4 @@
+from typing import Optional
 from app.models import CollectorData, RuleResult
 
 # RuleResult is now imported from models.py to avoid Pydantic type mismatch
@@ -17,8 +18,38 @@ def check_liquidity(data: CollectorData) -> RuleResult:
 def check_docs(data: CollectorData) -> RuleResult:
     if not data.docs_present:
         return RuleResult(rule_id="DOCS_MISSING", status="FAIL", reason="No documentation or whitepaper detected", source="WebScraper")
+    if data.docs:
+        fetched = len([p for p in data.docs["pages"] if p["status"] == 200])
+        return RuleResult(rule_id="DOCS_OK", status="PASS", reason=f"Documentation fetched ({fetched} pages)", source="DocsCrawler")
     return RuleResult(rule_id="DOCS_OK", status="PASS", reason="Documentation found", source="WebScraper")
 
+# Crawler findings are reported but do not decide whether the LLM agents run:
+# most projects publish no audit, so counting AUDIT_MISSING would run them on nearly every analysis
+BUDGET_EXEMPT_SOURCES = ("DocsCrawler",)
+
+def check_audit(data: CollectorData) -> Optional[RuleResult]:
+    # Only judged when the docs were crawled
+    if not data.docs:
+        return None
+    firms = data.docs["audit_firms"]
+    if firms:
+        return RuleResult(rule_id="AUDIT_FOUND", status="PASS", reason=f"Audit by {', '.join(firms)}", source="DocsCrawler")
+    if data.docs["audit_link"]:
+        return RuleResult(rule_id="AUDIT_UNVERIFIED", status="WARN", reason="Audit linked but no known audit firm named", source="DocsCrawler")
+    return RuleResult(rule_id="AUDIT_MISSING", status="WARN", reason="No audit found in docs", source="DocsCrawler")
+
+def check_allocation(data: CollectorData) -> Optional[RuleResult]:
+    allocation = (data.docs or {}).get("token_allocation")
+    if not allocation:
+        return None
+    total = sum(allocation.values())
+    team = data.docs["team_allocation_pct"]
+    if total > 105:
+        return RuleResult(rule_id="ALLOC_INCONSISTENT", status="WARN", reason=f"Token allocation sums to {total:.0f}%", source="DocsCrawler")
+    if team is not None and team > 25:
+        return RuleResult(rule_id="ALLOC_TEAM_HIGH", status="WARN", reason=f"Team/advisors hold {team:.0f}% of supply", source="DocsCrawler")
+    return RuleResult(rule_id="ALLOC_OK", status="PASS", reason="Token allocation published", source="DocsCrawler")
+
 def check_contracts(data: CollectorData) -> RuleResult:
     # Logic: If it's a token/contract/defi, it SHOULD have contracts.
     # But we don't strictly know the intent yet.
@@ -28,9 +59,25 @@ def check_contracts(data: CollectorData) -> RuleResult:
     # If it looks like an address but no modules
     return RuleResult(rule_id="CONTRACT_MISSING", status="WARN", reason="No modules found at address", source="AptosNode")
 
+def check_clone(data: CollectorData) -> Optional[RuleResult]:
+    # Set by the pipeline when the landing page matches an already analysed project
+    clone = data.raw_signals.get("clone_of")
+    if not clone:
+        return None
+    return RuleResult(
+        rule_id="CLONE_DETECTED",
+        status="WARN",
+        reason=f"Landing page is a near-duplicate ({clone['similarity']:.0%}) of {clone['projectUrl']}",
+        source="SimilarityIndex"
+    )
+
 def run_all_rules(data: CollectorData) -> list[RuleResult]:
     results = []
     results.append(check_docs(data))
     results.append(check_liquidity(data))
+    for check in (check_audit, check_allocation, check_clone):
+        result = check(data)
+        if result:
+            results.append(result)
     # Add more as needed
     return results
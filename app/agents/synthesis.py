@@ -1,5 +1,6 @@
 from app.models import RiskAnalysis, CredibilityAnalysis, FinalReport
 from app import llm
+from app.utils import deadline
 import json
 
 async def synthesize_report(
@@ -34,10 +35,11 @@ async def synthesize_report(
     Conflict Detected: {conflict_data.get('has_conflict') if conflict_data else False}
     """
     
-    verdict_text = await llm.get_text_completion(
+    # Falls back to the default summary if the request deadline runs out
+    verdict_text = await deadline.run_stage("summary", llm.get_text_completion(
         "Generate a 2-sentence executive summary. Stay factual and neutral.",
         summary_prompt
-    )
+    ))
 
     return FinalReport(
         final_score=final_score,
@@ -0,0 +1,343 @@
+"""
+Shared cache tier for reports, collector results and LLM responses.
+
+Every uvicorn worker is its own process, so in-process dicts neither share hits
+nor deduplicate upstream calls. Backends here are visible to all workers:
+
+- "sqlite" (default): a WAL-mode SQLite file shared by local processes.
+- "memory": per-process only, for single-worker runs and tooling.
+- "package.module:factory": any external store (e.g. Redis) implementing CacheBackend.
+
+Values must be JSON-serializable. Async code uses the a* accessors, which run
+the backend in a worker thread so a busy store never blocks the event loop.
+"""
+import asyncio
+import importlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "sqlite")
+CACHE_DB_PATH = os.getenv(
+    "CACHE_DB_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "aptoseidon_cache.db")
+)
+
+LEASE_POLL_SECONDS = 0.05
+# Fail fast on write contention; every accessor degrades on errors
+CACHE_BUSY_TIMEOUT = float(os.getenv("CACHE_BUSY_TIMEOUT", "0.1"))
+# Schema setup waits out other workers creating the same file at startup
+CACHE_INIT_TIMEOUT = 30.0
+
+class CacheBackend(ABC):
+    """
+    Interface for shared cache stores. Keys are scoped by namespace; ttl is in seconds.
+    """
+    # Backends that do no I/O (MemoryCache) are called directly from async code
+    blocking = True
+
+    @abstractmethod
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        ...
+
+    def get_many(self, namespace: str, keys: Iterable[str]) -> Dict[str, Any]:
+        found = {}
+        for key in keys:
+            value = self.get(namespace, key)
+            if value is not None:
+                found[key] = value
+        return found
+
+    @abstractmethod
+    def set(self, namespace: str, key: str, value: Any, ttl: float):
+        ...
+
+    @abstractmethod
+    def add(self, namespace: str, key: str, value: Any, ttl: float) -> bool:
+        """
+        Atomically stores value only if the key is absent or expired.
+        Returns True if this caller won. Used as a cross-process lease.
+        """
+
+    @abstractmethod
+    def delete(self, namespace: str, key: str):
+        ...
+
+class MemoryCache(CacheBackend):
+    """
+    Per-process backend (no cross-worker sharing).
+    """
+    blocking = False
+
+    def __init__(self):
+        self._data: Dict[tuple, tuple] = {}
+        self._lock = threading.Lock()
+
+    def get(self, namespace, key):
+        with self._lock:
+            entry = self._data.get((namespace, key))
+            if entry and entry[0] > time.time():
+                return entry[1]
+        return None
+
+    def set(self, namespace, key, value, ttl):
+        with self._lock:
+            self._data[(namespace, key)] = (time.time() + ttl, value)
+
+    def add(self, namespace, key, value, ttl):
+        with self._lock:
+            entry = self._data.get((namespace, key))
+            if entry and entry[0] > time.time():
+                return False
+            self._data[(namespace, key)] = (time.time() + ttl, value)
+            return True
+
+    def delete(self, namespace, key):
+        with self._lock:
+            self._data.pop((namespace, key), None)
+
+class SQLiteCache(CacheBackend):
+    """
+    Cross-process backend on a WAL-mode SQLite file (one connection per thread).
+    """
+    PURGE_EVERY = 500
+
+    def __init__(self, path: str = CACHE_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        # WAL mode is stored in the file, so only schema setup needs to switch it
+        conn = sqlite3.connect(self.path, timeout=CACHE_INIT_TIMEOUT, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute('''
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            ) WITHOUT ROWID
+            ''')
+        finally:
+            conn.close()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=CACHE_BUSY_TIMEOUT, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, namespace, key):
+        row = self._conn().execute(
+            'SELECT value FROM cache_entries WHERE namespace = ? AND key = ? AND expires_at > ?',
+            (namespace, key, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_many(self, namespace, keys):
+        keys = list(keys)
+        found = {}
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self._conn().execute(
+                f'SELECT key, value FROM cache_entries WHERE namespace = ? AND key IN ({placeholders}) AND expires_at > ?',
+                (namespace, *chunk, time.time())
+            ).fetchall()
+            found.update({key: json.loads(value) for key, value in rows})
+        return found
+
+    def set(self, namespace, key, value, ttl):
+        self._conn().execute(
+            'INSERT OR REPLACE INTO cache_entries (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)',
+            (namespace, key, json.dumps(value), time.time() + ttl)
+        )
+        self._maybe_purge()
+
+    def add(self, namespace, key, value, ttl):
+        now = time.time()
+        cursor = self._conn().execute('''
+        INSERT INTO cache_entries (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)
+        ON CONFLICT (namespace, key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at
+        WHERE cache_entries.expires_at <= ?
+        ''', (namespace, key, json.dumps(value), now + ttl, now))
+        return cursor.rowcount == 1
+
+    def delete(self, namespace, key):
+        self._conn().execute('DELETE FROM cache_entries WHERE namespace = ? AND key = ?', (namespace, key))
+
+    def _maybe_purge(self):
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            self._conn().execute('DELETE FROM cache_entries WHERE expires_at <= ?', (time.time(),))
+
+def _load_backend(spec: str) -> CacheBackend:
+    if spec == "sqlite":
+        return SQLiteCache()
+    if spec == "memory":
+        return MemoryCache()
+    # External store: "package.module:factory" returning a CacheBackend
+    module_name, _, attr = spec.partition(":")
+    factory = getattr(importlib.import_module(module_name), attr or "create_backend")
+    return factory()
+
+_backend: Optional[CacheBackend] = None
+_backend_lock = threading.Lock()
+
+def get_backend() -> CacheBackend:
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = _load_backend(CACHE_BACKEND)
+                logger.info(f"Cache backend: {type(_backend).__name__}")
+    return _backend
+
+def set_backend(backend: CacheBackend):
+    global _backend
+    _backend = backend
+
+# --- Safe accessors (a cache outage must never fail a request) ---
+
+def get(namespace: str, key: str) -> Optional[Any]:
+    try:
+        return get_backend().get(namespace, key)
+    except Exception as e:
+        logger.warning(f"Cache get failed ({namespace}): {e}")
+        return None
+
+def get_many(namespace: str, keys: Iterable[str]) -> Dict[str, Any]:
+    try:
+        return get_backend().get_many(namespace, keys)
+    except Exception as e:
+        logger.warning(f"Cache get_many failed ({namespace}): {e}")
+        return {}
+
+def set(namespace: str, key: str, value: Any, ttl: float):
+    try:
+        get_backend().set(namespace, key, value, ttl)
+    except Exception as e:
+        logger.warning(f"Cache set failed ({namespace}): {e}")
+
+def delete(namespace: str, key: str):
+    try:
+        get_backend().delete(namespace, key)
+    except Exception as e:
+        logger.warning(f"Cache delete failed ({namespace}): {e}")
+
+def try_lease(namespace: str, key: str, ttl: float) -> bool:
+    try:
+        return get_backend().add(f"lease:{namespace}", key, os.getpid(), ttl)
+    except Exception as e:
+        logger.warning(f"Cache lease failed ({namespace}): {e}")
+        return True # Degrade to computing locally
+
+def release_lease(namespace: str, key: str):
+    delete(f"lease:{namespace}", key)
+
+# --- Async accessors (same semantics, off the event loop) ---
+
+async def _offload(fn, *args):
+    # An unbuilt backend is built (and its errors handled) by `fn` in the worker thread
+    if _backend is None or _backend.blocking:
+        return await asyncio.to_thread(fn, *args)
+    return fn(*args)
+
+async def aget(namespace: str, key: str) -> Optional[Any]:
+    return await _offload(get, namespace, key)
+
+async def aget_many(namespace: str, keys: Iterable[str]) -> Dict[str, Any]:
+    return await _offload(get_many, namespace, list(keys))
+
+async def aset(namespace: str, key: str, value: Any, ttl: float):
+    await _offload(set, namespace, key, value, ttl)
+
+async def adelete(namespace: str, key: str):
+    await _offload(delete, namespace, key)
+
+async def atry_lease(namespace: str, key: str, ttl: float) -> bool:
+    return await _offload(try_lease, namespace, key, ttl)
+
+async def arelease_lease(namespace: str, key: str):
+    await _offload(release_lease, namespace, key)
+
+# --- Single-flight ---
+
+_inflight: Dict[tuple, asyncio.Future] = {}
+
+class _LeaderCancelled(Exception):
+    """
+    The coroutine computing a shared value was cancelled (e.g. its request ran out of time).
+    """
+
+async def get_or_compute(
+    namespace: str,
+    key: str,
+    ttl: float,
+    compute: Callable[[], Awaitable[Any]],
+    lease_ttl: float = 30.0,
+    cache_if: Optional[Callable[[Any], bool]] = None
+) -> Any:
+    """
+    Returns the cached value or computes it once across coroutines and worker processes.
+    None results, and results rejected by cache_if, are returned but not cached.
+    """
+    value = await aget(namespace, key)
+    if value is not None:
+        return value
+
+    # 1. In-process: concurrent callers share one future
+    flight = (namespace, key)
+    while flight in _inflight:
+        try:
+            return await asyncio.shield(_inflight[flight])
+        except _LeaderCancelled:
+            continue # The next waiter takes over the computation
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[flight] = future
+    try:
+        value = await _compute_with_lease(namespace, key, ttl, compute, lease_ttl, cache_if)
+        future.set_result(value)
+        return value
+    except BaseException as e:
+        # Waiters must not hang if the leading request fails or is cancelled
+        future.set_exception(e if isinstance(e, Exception) else _LeaderCancelled())
+        future.exception()  # Mark retrieved when nobody else waited
+        raise
+    finally:
+        _inflight.pop(flight, None)
+
+async def _compute_with_lease(namespace, key, ttl, compute, lease_ttl, cache_if):
+    # 2. Cross-process: one worker computes, the others poll for its result
+    deadline = time.monotonic() + lease_ttl
+    owned = await atry_lease(namespace, key, lease_ttl)
+    while not owned:
+        await asyncio.sleep(LEASE_POLL_SECONDS)
+        value = await aget(namespace, key)
+        if value is not None:
+            return value
+        if time.monotonic() > deadline:
+            break # Holder looks stuck; compute ourselves
+        owned = await atry_lease(namespace, key, lease_ttl)
+
+    try:
+        value = await aget(namespace, key) # Filled while we were acquiring
+        if value is None:
+            value = await compute()
+            if value is not None and (cache_if is None or cache_if(value)):
+                await aset(namespace, key, value, ttl)
+        return value
+    finally:
+        if owned:
+            await arelease_lease(namespace, key)
@@ -1,9 +1,19 @@
 import sqlite3
 import json
 import os
-from typing import Dict, Any, Optional
+import time
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
+from app import cache
+from app.utils.normalization import normalize_input
 
-DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "aptoseidon.db")
+DB_PATH = os.getenv(
+    "APTOSEIDON_DB_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "aptoseidon.db")
+)
+
+# Latest report per URL, shared across workers
+REPORT_CACHE_TTL = float(os.getenv("REPORT_CACHE_TTL", "3600"))
 
 def init_db():
     conn = sqlite3.connect(DB_PATH)
@@ -31,27 +41,69 @@ def init_db():
     )
     ''')
     
+    # Per-stage outputs keyed by input digest, for incremental re-analysis
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS stage_outputs (
+        project_key TEXT,
+        stage TEXT,
+        input_hash TEXT,
+        output_json TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (project_key, stage)
+    )
+    ''')
+    
+    # Near-duplicate index: one MinHash signature per project plus its LSH band buckets
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS page_signatures (
+        project_key TEXT PRIMARY KEY,
+        job_id TEXT,
+        project_url TEXT,
+        signature_json TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS signature_bands (
+        bucket TEXT,
+        project_key TEXT,
+        PRIMARY KEY (bucket, project_key)
+    )
+    ''')
+    
+    # Cache lookups fetch the newest report per URL
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_analyses_url_created ON analyses (project_url, created_at DESC)')
+    
     conn.commit()
     conn.close()
 
-def save_analysis(job_id: str, project_url: str, project_type: str, wallet_address: str, report: Dict[str, Any]):
+def save_analysis(job_id: str, project_url: str, project_type: str, wallet_address: Optional[str], report: Dict[str, Any]):
+    """
+    wallet_address None stores an unowned report (background refresh): it is
+    not in any wallet's history and replaces earlier unowned reports for the URL.
+    """
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     
     # Minimize storage: Remove large/stale data like marketData from history
     # We still keep the core AI analysis and pre-check data
-    pruned_report = json.loads(json.dumps(report)) # Deep copy
+    pruned_report = dict(report) # Only the nested report is modified, so a shallow copy suffices
     if "report" in pruned_report and "marketData" in pruned_report["report"]:
+        pruned_report["report"] = dict(pruned_report["report"])
         pruned_report["report"]["marketData"] = None # Prune market data to save space
     
+    report_json = json.dumps(pruned_report)
     cursor.execute('''
     INSERT OR REPLACE INTO analyses (job_id, project_url, project_type, wallet_address, report_json)
     VALUES (?, ?, ?, ?, ?)
-    ''', (job_id, project_url, project_type, wallet_address, json.dumps(pruned_report)))
+    ''', (job_id, project_url, project_type, wallet_address, report_json))
     
     # Initialize reputation for new job
     cursor.execute('INSERT OR IGNORE INTO reputation (job_id) VALUES (?)', (job_id,))
     
+    if wallet_address is None:
+        cursor.execute('DELETE FROM analyses WHERE project_url = ? AND wallet_address IS NULL AND job_id != ?', (project_url, job_id))
+
     # Cleanup: Keep only last 50 reports per wallet to stay in free tier
     cursor.execute('''
     DELETE FROM analyses 
@@ -65,6 +117,12 @@ def save_analysis(job_id: str, project_url: str, project_type: str, wallet_addre
     conn.commit()
     conn.close()
 
+    # The job may have been read (as unknown) before its reputation row existed
+    cache.delete("reputation", job_id)
+
+    # Newest report for the URL is what cache lookups should see
+    cache.set("reports", project_url, {"job_id": job_id, "report_json": report_json, "created_at": time.time()}, REPORT_CACHE_TTL)
+
 def get_history_by_wallet(wallet_address: str):
     conn = sqlite3.connect(DB_PATH)
     conn.row_factory = sqlite3.Row
@@ -89,18 +147,47 @@ def get_history_by_wallet(wallet_address: str):
         })
     return history
 
-def get_analysis_by_url(project_url: str) -> Optional[Dict[str, Any]]:
+def _parse_timestamp(value: Optional[str]) -> float:
+    # SQLite CURRENT_TIMESTAMP is UTC "YYYY-MM-DD HH:MM:SS"
+    if not value:
+        return 0.0
+    try:
+        return datetime.strptime(value, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc).timestamp()
+    except ValueError:
+        return 0.0
+
+def get_report_json_by_url(project_url: str) -> Optional[Dict[str, Any]]:
+    """
+    Latest stored report for a URL as raw JSON text (never parsed), for zero-copy serving.
+    created_at is a Unix timestamp.
+    """
+    cached = cache.get("reports", project_url)
+    if cached:
+        return cached
+
     conn = sqlite3.connect(DB_PATH)
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
-    cursor.execute('SELECT * FROM analyses WHERE project_url = ? ORDER BY created_at DESC LIMIT 1', (project_url,))
+    cursor.execute('SELECT job_id, report_json, created_at FROM analyses WHERE project_url = ? ORDER BY created_at DESC LIMIT 1', (project_url,))
     row = cursor.fetchone()
     conn.close()
     
     if row:
-        return {
+        result = {
             "job_id": row["job_id"],
-            "report": json.loads(row["report_json"])
+            "report_json": row["report_json"],
+            "created_at": _parse_timestamp(row["created_at"])
+        }
+        cache.set("reports", project_url, result, REPORT_CACHE_TTL)
+        return result
+    return None
+
+def get_analysis_by_url(project_url: str) -> Optional[Dict[str, Any]]:
+    raw = get_report_json_by_url(project_url)
+    if raw:
+        return {
+            "job_id": raw["job_id"],
+            "report": json.loads(raw["report_json"])
         }
     return None
 
@@ -127,3 +214,115 @@ def get_rating(job_id: str) -> Dict[str, int]:
     if row:
         return {"up": row["up_votes"], "down": row["down_votes"]}
     return {"up": 0, "down": 0}
+
+def apply_rating_deltas(deltas: Dict[str, Dict[str, int]]):
+    """
+    Applies aggregated vote counts in a single transaction.
+    deltas: {job_id: {"up": n, "down": m}}
+    """
+    if not deltas:
+        return
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.executemany(
+        'UPDATE reputation SET up_votes = up_votes + ?, down_votes = down_votes + ? WHERE job_id = ?',
+        [(d.get("up", 0), d.get("down", 0), job_id) for job_id, d in deltas.items()]
+    )
+    conn.commit()
+    conn.close()
+
+def get_ratings(job_ids: List[str]) -> Dict[str, Dict[str, int]]:
+    """
+    Bulk variant of get_rating. Unknown job ids (no reputation row) are omitted.
+    """
+    ratings = {}
+    if not job_ids:
+        return ratings
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    ids = list(dict.fromkeys(job_ids))
+    # Stay well under SQLite's bound-parameter limit
+    for i in range(0, len(ids), 500):
+        chunk = ids[i:i + 500]
+        placeholders = ",".join("?" * len(chunk))
+        cursor.execute(f'SELECT job_id, up_votes, down_votes FROM reputation WHERE job_id IN ({placeholders})', chunk)
+        for row in cursor.fetchall():
+            ratings[row["job_id"]] = {"up": row["up_votes"], "down": row["down_votes"]}
+    conn.close()
+    return ratings
+
+def get_stage_outputs(project_key: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Stored stage outputs for a project: {stage: {"input_hash": ..., "output": ...}}
+    """
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    cursor.execute('SELECT stage, input_hash, output_json FROM stage_outputs WHERE project_key = ?', (project_key,))
+    rows = cursor.fetchall()
+    conn.close()
+    return {row["stage"]: {"input_hash": row["input_hash"], "output": json.loads(row["output_json"])} for row in rows}
+
+def save_stage_outputs(project_key: str, outputs: Dict[str, Dict[str, Any]]):
+    """
+    Upserts stage outputs ({stage: {"input_hash": ..., "output": ...}}) in one transaction.
+    """
+    if not outputs:
+        return
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.executemany('''
+    INSERT OR REPLACE INTO stage_outputs (project_key, stage, input_hash, output_json)
+    VALUES (?, ?, ?, ?)
+    ''', [(project_key, stage, o["input_hash"], json.dumps(o["output"])) for stage, o in outputs.items()])
+    conn.commit()
+    conn.close()
+
+def save_signature(job_id: str, project_url: str, project_key: str, signature: List[int], buckets: List[str]):
+    """
+    Replaces the project's signature and band buckets in the near-duplicate index.
+    """
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute('''
+    INSERT OR REPLACE INTO page_signatures (project_key, job_id, project_url, signature_json)
+    VALUES (?, ?, ?, ?)
+    ''', (project_key, job_id, project_url, json.dumps(signature)))
+    cursor.execute('DELETE FROM signature_bands WHERE project_key = ?', (project_key,))
+    cursor.executemany('INSERT OR IGNORE INTO signature_bands (bucket, project_key) VALUES (?, ?)',
+                       [(bucket, project_key) for bucket in buckets])
+    conn.commit()
+    conn.close()
+
+def find_signature_candidates(
+    buckets: List[str], exclude_project_key: str, exclude_project_url: str = "", limit: int = 20
+) -> List[Dict[str, Any]]:
+    """
+    Projects sharing at least one band bucket, most shared buckets first.
+    Rows for exclude_project_url (compared normalized, e.g. the same site under
+    another project type) are left out along with exclude_project_key.
+    """
+    if not buckets:
+        return []
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    conn.create_function("normalize_url", 1, normalize_input, deterministic=True)
+    cursor = conn.cursor()
+    placeholders = ",".join("?" * len(buckets))
+    cursor.execute(f'''
+    SELECT s.project_key, s.job_id, s.project_url, s.signature_json
+    FROM signature_bands b JOIN page_signatures s ON s.project_key = b.project_key
+    WHERE b.bucket IN ({placeholders}) AND b.project_key != ? AND normalize_url(s.project_url) != ?
+    GROUP BY b.project_key
+    ORDER BY COUNT(*) DESC
+    LIMIT ?
+    ''', (*buckets, exclude_project_key, normalize_input(exclude_project_url), limit))
+    rows = cursor.fetchall()
+    conn.close()
+    return [{
+        "project_key": row["project_key"],
+        "job_id": row["job_id"],
+        "project_url": row["project_url"],
+        "signature": json.loads(row["signature_json"])
+    } for row in rows]
@@ -0,0 +1,76 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Tuple
+
+from app import cache
+
+logger = logging.getLogger(__name__)
+
+# (ttl, hard_expiry) in seconds, matched against project_type.
+# Market-driven projects go stale fastest; docs/contract-driven ones slowly.
+FRESHNESS_POLICIES: Dict[str, Tuple[int, int]] = {
+    "Token": (15 * 60, 6 * 3600),
+    "Coin": (15 * 60, 6 * 3600),
+    "DeFi": (2 * 3600, 2 * 86400),
+    "NFT": (6 * 3600, 3 * 86400),
+}
+DEFAULT_POLICY: Tuple[int, int] = (24 * 3600, 7 * 86400)
+
+REFRESH_LEASE_SECONDS = 300
+
+FRESH = "fresh"
+STALE = "stale"
+EXPIRED = "expired"
+
+_refreshing: Dict[str, asyncio.Task] = {}
+
+def policy_for(project_type: str) -> Tuple[int, int]:
+    for keyword, policy in FRESHNESS_POLICIES.items():
+        if keyword in project_type:
+            return policy
+    return DEFAULT_POLICY
+
+def classify(created_at: float, project_type: str) -> Tuple[str, float]:
+    """
+    Returns (state, age_seconds) for a stored report.
+    """
+    ttl, hard_expiry = policy_for(project_type)
+    age = max(0.0, time.time() - created_at)
+    if age <= ttl:
+        return FRESH, age
+    if age <= hard_expiry:
+        return STALE, age
+    return EXPIRED, age
+
+def metadata(state: str, age: float, project_type: str, refreshing: bool = False) -> dict:
+    ttl, hard_expiry = policy_for(project_type)
+    return {
+        "state": state,
+        "ageSeconds": int(age),
+        "ttlSeconds": ttl,
+        "hardExpirySeconds": hard_expiry,
+        "refreshing": refreshing
+    }
+
+async def schedule_refresh(key: str, refresh: Callable[[], Awaitable[object]]):
+    """
+    Starts a background recompute for `key` unless one is already running
+    in this worker or (via a shared-cache lease) in another one.
+    """
+    if key in _refreshing:
+        return
+    if not await cache.atry_lease("refresh", key, REFRESH_LEASE_SECONDS):
+        return
+
+    async def run():
+        try:
+            await refresh()
+            logger.info(f"Background refresh done for {key}")
+        except Exception as e:
+            logger.error(f"Background refresh failed for {key}: {e}")
+        finally:
+            _refreshing.pop(key, None)
+            await cache.arelease_lease("refresh", key)
+
+    _refreshing[key] = asyncio.create_task(run())
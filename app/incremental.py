@@ -0,0 +1,143 @@
+"""
+Incremental re-analysis.
+
+Each agent stage's inputs are reduced to a digest (scraped text, bucketed
+market snapshot, on-chain summary, social results, rule results) and stored
+next to its output. On re-analysis a stage whose digest is unchanged reuses
+the stored output instead of calling the LLM again.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import math
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Type
+
+from pydantic import BaseModel
+
+from app import database
+from app.models import CollectorData, RuleResult
+from app.utils.normalization import generate_fingerprint
+
+logger = logging.getLogger(__name__)
+
+# Market fields compared at 2 significant figures (small drifts keep the same bucket)
+MARKET_NUMERIC_FIELDS = ["price_usd", "market_cap", "vol_24h", "ath", "atl", "fdv", "total_supply", "circ_supply"]
+CHANGE_BUCKET_PCT = 5
+
+def digest(value: Any) -> str:
+    payload = json.dumps(value, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+def _significant(value, digits: int = 2):
+    try:
+        value = float(value or 0)
+    except (TypeError, ValueError):
+        return None
+    if value == 0 or math.isnan(value) or math.isinf(value):
+        return 0
+    return float(f"{value:.{digits}g}")
+
+def market_bucket(market_data: Optional[dict]) -> Optional[dict]:
+    if not market_data:
+        return None
+    bucket = {field: _significant(market_data.get(field)) for field in MARKET_NUMERIC_FIELDS}
+    bucket["coingecko_id"] = market_data.get("coingecko_id")
+    bucket["symbol"] = market_data.get("symbol")
+    change = market_data.get("change_24h") or 0
+    bucket["change_24h"] = int(round(float(change) / CHANGE_BUCKET_PCT)) if isinstance(change, (int, float)) else None
+    return bucket
+
+def collector_digests(data: CollectorData) -> Dict[str, str]:
+    # Aptos account resources expose no stable ledger version, so the on-chain
+    # part is keyed on the module summary instead
+    return {
+        "text": digest(data.raw_signals.get("text_content", "")),
+        "market": digest(market_bucket(data.market_data)),
+        "on_chain": digest(data.on_chain_data),
+        "social": digest(sorted(data.social_signals or [])),
+        "docs": digest({k: v for k, v in (data.docs or {}).items() if k != "pages"}),
+        "project": digest([data.project_name, data.docs_present, data.contracts_found]),
+    }
+
+def rules_digest(rule_results: List[RuleResult]) -> str:
+    return digest([[r.rule_id, r.status, r.reason] for r in rule_results])
+
+def project_key(project_url: str, project_type: str) -> str:
+    return generate_fingerprint(project_url, project_type)
+
+class StageRunner:
+    """
+    Runs agent stages for one analysis, reusing stored outputs whose inputs are unchanged.
+    Call load() before running stages.
+    """
+    def __init__(self, key: str):
+        self.key = key
+        self.previous: Dict[str, Dict[str, Any]] = {}
+        self.reused: List[str] = []
+        self.recomputed: List[str] = []
+        self._outputs: Dict[str, Dict[str, Any]] = {}
+        self._borrowed: Dict[str, Any] = {}
+
+    async def load(self):
+        try:
+            self.previous = await asyncio.to_thread(database.get_stage_outputs, self.key)
+        except Exception as e:
+            logger.warning(f"Stage outputs unavailable for {self.key}: {e}")
+
+    def borrow(self, outputs: Dict[str, Dict[str, Any]], stages: List[str]) -> List[str]:
+        """
+        Takes stored outputs of another project (a near-duplicate) for `stages`;
+        they are used regardless of input digests. Returns the stages borrowed.
+        """
+        for stage in stages:
+            if stage in outputs:
+                self._borrowed[stage] = outputs[stage]["output"]
+        return [stage for stage in stages if stage in self._borrowed]
+
+    async def run(
+        self,
+        stage: str,
+        inputs: Any,
+        compute: Callable[[], Awaitable[Any]],
+        model: Optional[Type[BaseModel]] = None,
+        reusable: Callable[[Any], bool] = lambda output: True
+    ) -> Any:
+        """
+        inputs: digests the stage depends on. reusable: whether an output may be stored
+        (e.g. not an LLM error fallback).
+        """
+        input_hash = digest(inputs)
+        prev = self.previous.get(stage)
+        if prev and prev["input_hash"] == input_hash:
+            self.reused.append(stage)
+            self._outputs[stage] = prev
+            return model(**prev["output"]) if model else prev["output"]
+
+        if stage in self._borrowed:
+            self.reused.append(stage)
+            self._outputs[stage] = {"input_hash": input_hash, "output": self._borrowed[stage]}
+            output = self._borrowed[stage]
+            return model(**output) if model else output
+
+        output = await compute()
+        self.recomputed.append(stage)
+        if reusable(output):
+            stored = output.model_dump() if isinstance(output, BaseModel) else output
+            self._outputs[stage] = {"input_hash": input_hash, "output": stored}
+        return output
+
+    def record(self, stage: str, inputs: Any, output: Any = None):
+        """
+        Stores digests for non-agent stages (collector sources, rules) next to their summary.
+        """
+        self._outputs[stage] = {"input_hash": digest(inputs), "output": output if output is not None else inputs}
+
+    async def save(self):
+        try:
+            await asyncio.to_thread(database.save_stage_outputs, self.key, self._outputs)
+        except Exception as e:
+            logger.warning(f"Failed to store stage outputs for {self.key}: {e}")
+
+    def summary(self) -> dict:
+        return {"reusedStages": self.reused, "recomputedStages": self.recomputed}
@@ -1,27 +1,53 @@
 import os
-from openai import AsyncOpenAI
-from dotenv import load_dotenv
+import hashlib
+import json
+from app import cache
+from app.utils.env import load_env
 import logging
 
-load_dotenv()
-
 logger = logging.getLogger(__name__)
 
-client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Built on first use: importing openai is a large share of cold-start time
+_client = None
+
+def get_client():
+    global _client
+    if _client is None:
+        load_env()
+        from openai import AsyncOpenAI
+        from app.utils import cassette
+        if cassette.enabled():
+            import httpx
+            _client = AsyncOpenAI(
+                api_key=os.getenv("OPENAI_API_KEY") or "replay",
+                http_client=httpx.AsyncClient(transport=cassette.transport())
+            )
+        else:
+            _client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    return _client
 
 MODEL_FAST = "gpt-4o-mini"
 MAX_INPUT_CHARS = 3000 # Truncate input to avoid token waste
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "86400")) # Identical prompts reuse the response
+
+def _cache_key(kind: str, system_prompt: str, user_content: str) -> str:
+    payload = json.dumps([kind, MODEL_FAST, system_prompt, user_content])
+    return hashlib.sha256(payload.encode()).hexdigest()
 
 async def get_json_completion(system_prompt: str, user_content: str):
     """
     Helper for cheap JSON mode analysis.
     """
+    key = _cache_key("json", system_prompt, user_content)
+    return await cache.get_or_compute("llm", key, LLM_CACHE_TTL, lambda: _json_completion(system_prompt, user_content))
+
+async def _json_completion(system_prompt: str, user_content: str):
     try:
         # Truncate content
         if len(user_content) > MAX_INPUT_CHARS:
             user_content = user_content[:MAX_INPUT_CHARS] + "...[TRUNCATED]"
 
-        response = await client.chat.completions.create(
+        response = await get_client().chat.completions.create(
             model=MODEL_FAST,
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -40,11 +66,15 @@ async def get_text_completion(system_prompt: str, user_content: str):
     """
     Helper for narrative output.
     """
+    key = _cache_key("text", system_prompt, user_content)
+    return await cache.get_or_compute("llm", key, LLM_CACHE_TTL, lambda: _text_completion(system_prompt, user_content))
+
+async def _text_completion(system_prompt: str, user_content: str):
     try:
         if len(user_content) > MAX_INPUT_CHARS:
             user_content = user_content[:MAX_INPUT_CHARS] + "...[TRUNCATED]"
             
-        response = await client.chat.completions.create(
+        response = await get_client().chat.completions.create(
             model=MODEL_FAST,
             messages=[
                 {"role": "system", "content": system_prompt},
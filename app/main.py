@@ -1,18 +1,68 @@
+import asyncio
 import logging
-from fastapi import FastAPI, UploadFile, File, Form, Body, HTTPException
+import os
+from contextlib import asynccontextmanager
+from app.utils.env import load_env
+
+# Before any app module reads its settings
+load_env()
+
+from fastapi import FastAPI, UploadFile, File, Form, Body, HTTPException, Query
 
 logger = logging.getLogger(__name__)
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import Response
 from app.models import CollectorData, RiskAnalysis, CredibilityAnalysis, FinalReport
-from app.agents import collector, risk, credibility, synthesis, rules, narrative, contradiction
-from app.utils import x402
-from app import database
+from app.agents import collector, precheck, risk, credibility, synthesis, rules, narrative, contradiction
+from app.utils import x402, timing, http, deadline, cassette
+from app.utils.responses import FastJSONResponse, RawJSONResponse, splice_json_object
+from app import cache, database, freshness, incremental, llm, scheduler, similarity
+from app.reputation import votes
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 import uuid
 
-app = FastAPI(title="Aptoseidon Agentic Backend")
+# Shares of the remaining request budget given to individual stages
+PAYMENT_BUDGET_SHARE = 0.3
+AGENTS_BUDGET_SHARE = 0.6
+CONTRADICTION_BUDGET_SHARE = 0.5
+
+# Agent stages a near-duplicate takes over from the project it clones (see similarity.clone_outputs)
+CLONE_REUSED_STAGES = ["risk", "credibility"]
+
+# Pre-import heavy dependencies and build clients after startup instead of on the first request
+WARMUP = os.getenv("WARMUP", "0") == "1"
+
+def _import_heavy_modules():
+    import bs4, openai  # noqa: F401
+    if not collector.SEARCH_API_URL:
+        import googlesearch  # noqa: F401
+
+async def warm_up():
+    try:
+        await asyncio.to_thread(_import_heavy_modules)
+        llm.get_client()
+        http.get_client()
+        cache.get_backend()
+        logger.info("Warm-up complete")
+    except Exception as e:
+        logger.warning(f"Warm-up failed: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    logging.basicConfig(level=logging.INFO)
+    database.init_db()
+    votes.start()
+    warm_task = asyncio.create_task(warm_up()) if WARMUP else None
+    yield
+    if warm_task:
+        warm_task.cancel()
+    # Persist any votes still buffered in memory
+    await votes.stop()
+    await http.close_client()
+    scheduler.shutdown()
+
+app = FastAPI(title="Aptoseidon Agentic Backend", lifespan=lifespan, default_response_class=FastJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -22,9 +72,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize database on load
-database.init_db()
-
 class AnalyzeRequest(BaseModel):
     project_url: str
     project_type: str
@@ -32,6 +79,7 @@ class AnalyzeRequest(BaseModel):
     payment_tx_hash: Optional[str] = None
     request_mode: str = "full" # "pre_check" or "full"
     evidence_only: bool = False
+    deadline_ms: Optional[int] = None # Overrides the tier's default time budget
 
 @app.get("/")
 async def root():
@@ -41,25 +89,75 @@ async def root():
 
 @app.post("/analyze")
 async def analyze_project(request: AnalyzeRequest):
-    # 0. Check Payment
-    is_valid_payment = False
-    if request.payment_tx_hash:
-        is_valid_payment = await x402.verify_payment(request.payment_tx_hash)
+    stages = timing.start_request()
+    budget = deadline.start(deadline.budget_for(False, request.deadline_ms))
+    cassette.start(request.model_dump())
+    # Only a verified payment for a full analysis gets the paid budget and a paid slot,
+    # so it is checked before admission (pre-checks and evidence-only requests stay free)
+    wants_paid = bool(request.payment_tx_hash) and request.request_mode == "full" and not request.evidence_only
+    payment = None
+    try:
+        if wants_paid:
+            # Bounded separately: random hashes must not buy unthrottled node lookups
+            async with scheduler.admit(scheduler.VERIFY, timeout=budget.remaining()):
+                payment = await _verify_payment(request.payment_tx_hash)
+        paid = payment is True
+        if paid:
+            budget = deadline.start(deadline.budget_for(True, request.deadline_ms))
+        # Paid and free requests queue separately; free traffic is shed first under load.
+        # Time spent queued counts against the request deadline.
+        async with scheduler.admit(scheduler.classify(paid), timeout=budget.remaining()) as waited:
+            stages["queue"] = waited * 1000
+            if request.payment_tx_hash and not wants_paid:
+                payment = await _verify_payment(request.payment_tx_hash)
+            result = await _analyze(request, payment)
+    except scheduler.Overloaded as e:
+        scheduler.reject(e)
+        raise HTTPException(
+            status_code=429,
+            detail={"error": "Too Many Requests", "message": f"Server busy ({e.reason}), retry later."},
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    job_id = result.get("jobId") if isinstance(result, dict) else None
+    response = result if isinstance(result, Response) else FastJSONResponse(result)
+    await cassette.finish(job_id or f"request-{uuid.uuid4().hex[:8]}", response.status_code)
+    # Per-stage breakdown for clients and the benchmark harness
+    response.headers["Server-Timing"] = timing.server_timing_header(stages)
+    return response
+
+async def _verify_payment(tx_hash: str) -> Optional[bool]:
+    """
+    Payment check within the request budget; None when it timed out.
+    """
+    with timing.stage("payment"):
+        return await deadline.run_stage(
+            "payment", x402.verify_payment_cached(tx_hash), None, share=PAYMENT_BUDGET_SHARE
+        )
+
+async def _analyze(request: AnalyzeRequest, payment: Optional[bool] = None):
+    # 0. Payment (verified by the caller; None = no hash or verification timed out)
+    is_valid_payment = bool(payment)
+    # Verification timed out: degrade to the free pre-check instead of asking for payment again
+    payment_unverified = bool(request.payment_tx_hash) and payment is None
 
     # 1. Check Cache for Paid Reports
     if is_valid_payment:
-        cached = database.get_analysis_by_url(request.project_url)
+        with timing.stage("cache"):
+            cached = await asyncio.to_thread(database.get_report_json_by_url, request.project_url)
         if cached:
-            logger.info(f"Returning cached report for {request.project_url}")
-            return {
-                "status": "ok",
-                "preCheck": cached["report"]["preCheck"],
-                "report": cached["report"]["report"],
-                "jobId": cached["job_id"]
-            }
+            state, age = freshness.classify(cached.get("created_at", 0.0), request.project_type)
+            if state != freshness.EXPIRED:
+                if state == freshness.STALE:
+                    # Serve now, recompute in the background (deduplicated across workers)
+                    await freshness.schedule_refresh(request.project_url, lambda: _refresh_report(request))
+                logger.info(f"Returning {state} cached report for {request.project_url}")
+                meta = freshness.metadata(state, age, request.project_type, refreshing=state == freshness.STALE)
+                # Stored text is already the {status, preCheck, report, jobId} body; splice metadata in front
+                return RawJSONResponse(splice_json_object({"freshness": meta}, cached["report_json"]))
+            logger.info(f"Cached report for {request.project_url} past hard expiry, recomputing")
 
     # If full report requested but not paid -> 402 (unless evidence_only is true)
-    if request.request_mode == "full" and not is_valid_payment and not request.evidence_only:
+    if request.request_mode == "full" and not is_valid_payment and not request.evidence_only and not payment_unverified:
         raise HTTPException(
             status_code=402, 
             detail={
@@ -70,26 +168,80 @@ async def analyze_project(request: AnalyzeRequest):
             }
         )
 
-    # 1. Collect Data
-    data = await collector.collect_data(request.project_url, request.project_type)
-    
-    # 1.5. Deterministic Rules (Trust Layer)
-    rule_results = rules.run_all_rules(data)
-    
-    # Pre-check logic (Free or Fallback)
-    pre_check = {
-        "age": data.domain_age,
-        "liquidity": "Unknown (Agent Stub)",
-        "socialMentions": "High" if data.docs_present else "Low",
-        "contractVerified": data.contracts_found
-    }
-
-    # If only pre-check requested, return early
+    # Free path: lightweight pre-check only (no social search, no full scrape pipeline)
     if request.request_mode == "pre_check" or (not is_valid_payment):
-        return {
+        with timing.stage("precheck"):
+            pre_check = await precheck.run_pre_check(request.project_url, request.project_type)
+        result = {
             "status": "pre_check_ok",
             "preCheck": pre_check,
         }
+        degraded = deadline.report()
+        if degraded:
+            result["degraded"] = degraded
+        return result
+
+    result = await run_full_analysis(request)
+    return {"freshness": freshness.metadata(freshness.FRESH, 0, request.project_type), **result}
+
+async def _refresh_report(request: AnalyzeRequest):
+    timing.start_request() # Keep background stages out of the triggering request's timings
+    budget = deadline.start(deadline.budget_for(paid=True))
+    cassette.start(request.model_dump()) # Own cassette, not the triggering request's
+    # Refreshes are paid-pipeline work and count against the paid concurrency limit
+    try:
+        async with scheduler.admit(scheduler.PAID, timeout=budget.remaining()):
+            # Not stored under the triggering caller's wallet (history, 50-report cap)
+            result = await run_full_analysis(request, owner=None)
+    except scheduler.Overloaded as e:
+        scheduler.reject(e)
+        return
+    await cassette.finish(result["jobId"])
+
+async def run_full_analysis(request: AnalyzeRequest, owner: Optional[str] = "") -> dict:
+    """
+    Paid pipeline: collect, rules, agents, synthesis; persists the report.
+    Stages that miss the request deadline fall back to defaults and the report
+    is returned as partial (not persisted).
+    owner: wallet the report is stored under ("" = the requester, None = unowned).
+    """
+    if owner == "":
+        owner = request.wallet_address
+    # 1. Collect Data
+    with timing.stage("collect"):
+        data = await deadline.run_stage(
+            "collect",
+            collector.collect_data_cached(request.project_url, request.project_type),
+            _empty_collector_data(request.project_url)
+        )
+    for source in data.degraded_sources:
+        deadline.mark(source, deadline.TIMED_OUT)
+
+    # Incremental re-analysis: stages whose input digests are unchanged reuse stored outputs
+    stage_runner = incremental.StageRunner(incremental.project_key(request.project_url, request.project_type))
+    await stage_runner.load()
+
+    # Near-duplicate detection: a clone of an analysed project borrows its (penalized) scores
+    with timing.stage("similarity"):
+        # MinHash and SQLite lookups are blocking work: keep them off the event loop
+        page_signature = await asyncio.to_thread(similarity.page_signature, data.raw_signals)
+        clone = await asyncio.to_thread(similarity.find_clone, page_signature, stage_runner.key, request.project_url)
+        clone_outputs = await asyncio.to_thread(similarity.clone_outputs, clone) if clone else {}
+    if clone:
+        logger.info(f"{request.project_url} is a near-duplicate of {clone['projectUrl']} ({clone['similarity']})")
+        clone["reusedStages"] = stage_runner.borrow(clone_outputs, CLONE_REUSED_STAGES)
+        data = data.model_copy(update={"raw_signals": {**data.raw_signals, "clone_of": clone}})
+    
+    # 1.5. Deterministic Rules (Trust Layer)
+    with timing.stage("rules"):
+        rule_results = rules.run_all_rules(data)
+    
+    pre_check = precheck.build_pre_check(
+        data.domain_age,
+        data.docs_present,
+        data.contracts_found,
+        data.market_data is not None
+    )
     
     # 2. Parallel Analysis (Budget Controller & Evidence Mode)
     risk_result = None
@@ -98,8 +250,9 @@ async def analyze_project(request: AnalyzeRequest):
     fin_analysis = None
     conflict_data = {"has_conflict": False, "reason": ""}
     
-    fail_count = len([r for r in rule_results if r.status == "FAIL"])
-    warn_count = len([r for r in rule_results if r.status == "WARN"])
+    budget_rules = [r for r in rule_results if r.source not in rules.BUDGET_EXEMPT_SOURCES]
+    fail_count = len([r for r in budget_rules if r.status == "FAIL"])
+    warn_count = len([r for r in budget_rules if r.status == "WARN"])
     
     skip_agents = request.evidence_only
     if not skip_agents:
@@ -107,14 +260,55 @@ async def analyze_project(request: AnalyzeRequest):
             logger.info("Budget Controller: Skipping LLM agents.")
             skip_agents = True
 
+    digests = incremental.collector_digests(data)
+    rules_hash = incremental.rules_digest(rule_results)
+    stage_runner.record("collector", digests)
+    stage_runner.record("rules", rules_hash, [r.model_dump() for r in rule_results])
+
     if not skip_agents:
-        # Run specialized agents
-        risk_result = await risk.assess_risk(data)
-        credibility_result = await credibility.assess_credibility(data)
-        
+        # Run specialized agents (independent of each other, so concurrently).
+        # A stage cut off by the deadline gets its fallback and nothing is stored for it.
+        async def run_risk():
+            with timing.stage("risk"):
+                return await deadline.run_stage("risk", stage_runner.run(
+                    "risk",
+                    [digests["text"], digests["market"], digests["on_chain"], digests["docs"]],
+                    lambda: risk.assess_risk(data),
+                    RiskAnalysis,
+                    reusable=lambda r: risk.FALLBACK_FLAG not in r.risk_flags
+                ), RiskAnalysis(risk_score=0.5, risk_flags=[risk.FALLBACK_FLAG]), share=AGENTS_BUDGET_SHARE)
+
+        async def run_credibility():
+            with timing.stage("credibility"):
+                result = await deadline.run_stage("credibility", stage_runner.run(
+                    "credibility",
+                    [digests["text"], digests["market"], digests["social"], digests["docs"]],
+                    lambda: credibility.assess_credibility(data),
+                    CredibilityAnalysis,
+                    reusable=lambda c: c is not None # None = LLM error
+                ), None, share=AGENTS_BUDGET_SHARE)
+            return result or CredibilityAnalysis(credibility_score=0.5, positive_signals=[])
+
         # New agents for Phase 2
-        narrative_text = await narrative.generate_narrative(data, rule_results)
-        conflict_data = await contradiction.detect_conflict(rule_results, risk_result, credibility_result)
+        async def run_narrative():
+            with timing.stage("narrative"):
+                return await deadline.run_stage("narrative", stage_runner.run(
+                    "narrative",
+                    [digests["project"], digests["market"], rules_hash],
+                    lambda: narrative.generate_narrative(data, rule_results),
+                    reusable=lambda text: text != narrative.FALLBACK_NARRATIVE
+                ), narrative.FALLBACK_NARRATIVE, share=AGENTS_BUDGET_SHARE)
+
+        risk_result, credibility_result, narrative_text = await asyncio.gather(
+            run_risk(), run_credibility(), run_narrative()
+        )
+        with timing.stage("contradiction"):
+            conflict_data = await deadline.run_stage("contradiction", stage_runner.run(
+                "contradiction",
+                [rules_hash, risk_result.model_dump(), credibility_result.model_dump()],
+                lambda: contradiction.detect_conflict(rule_results, risk_result, credibility_result),
+                reusable=lambda c: c.get("reason") != contradiction.FALLBACK_REASON
+            ), conflict_data, share=CONTRADICTION_BUDGET_SHARE)
         
         # Financial Structure (Compliant)
         # We can still use the synthesis logic for financial structure or keep it separate
@@ -126,14 +320,15 @@ async def analyze_project(request: AnalyzeRequest):
         narrative_text = "Baseline structural report based on deterministic rules."
 
     # 3. Synthesis
-    final_report = await synthesis.synthesize_report(
-        risk_result, 
-        credibility_result, 
-        data.market_data, 
-        rule_results,
-        narrative_text,
-        conflict_data
-    )
+    with timing.stage("synthesis"):
+        final_report = await synthesis.synthesize_report(
+            risk_result, 
+            credibility_result, 
+            data.market_data, 
+            rule_results,
+            narrative_text,
+            conflict_data
+        )
     
     # 4. Map to Frontend Response Format
     frontend_report = {
@@ -146,10 +341,13 @@ async def analyze_project(request: AnalyzeRequest):
         "positiveSignals": final_report.credibility.positive_signals,
         "marketData": data.market_data,
         "financialAnalysis": final_report.financial_analysis,
-        "ruleResults": [r.dict() for r in (final_report.rule_results or [])],
+        "ruleResults": [r.model_dump() for r in (final_report.rule_results or [])],
         "agentConflict": final_report.agent_conflict,
-        "narrative": final_report.narrative
+        "narrative": final_report.narrative,
+        **stage_runner.summary()
     }
+    if clone:
+        frontend_report["cloneOf"] = {k: clone[k] for k in ("jobId", "projectUrl", "similarity", "reusedStages")}
     
     job_id = f"agent-{uuid.uuid4().hex[:8]}"
     
@@ -159,13 +357,40 @@ async def analyze_project(request: AnalyzeRequest):
         "report": frontend_report,
         "jobId": job_id
     }
+
+    degraded = deadline.report()
+    if degraded:
+        # Partial reports are returned but never cached or persisted
+        result["degraded"] = degraded
+        logger.warning(f"Returning partial report for {request.project_url}: {degraded}")
+        return result
     
-    # 5. Persist if it's a full paid report
-    if is_valid_payment:
-        database.save_analysis(job_id, request.project_url, request.project_type, request.wallet_address, result)
+    # 5. Persist (only paid requests reach this pipeline)
+    with timing.stage("persist"):
+        await asyncio.to_thread(database.save_analysis, job_id, request.project_url, request.project_type, owner, result)
+        await stage_runner.save()
+        await asyncio.to_thread(similarity.add, job_id, request.project_url, stage_runner.key, page_signature)
         
     return result
 
+def _empty_collector_data(project_url: str) -> CollectorData:
+    # Fallback when collection as a whole misses the deadline
+    return CollectorData(
+        project_name=project_url,
+        domain_age="Unknown",
+        contracts_found=False,
+        docs_present=False,
+        raw_signals={"text_content": ""},
+        degraded_sources=["collect"]
+    )
+
+@app.get("/scheduler/stats")
+async def scheduler_stats():
+    return {
+        "status": "ok",
+        "classes": scheduler.stats()
+    }
+
 @app.get("/history/{wallet_address}")
 async def get_history(wallet_address: str):
     history = database.get_history_by_wallet(wallet_address)
@@ -180,23 +405,33 @@ class RatingRequest(BaseModel):
     job_id: str
     rating: str # "up" or "down"
 
-# In-memory store for demo
-mock_ratings = {
-    "agent-123": {"up": 5, "down": 0}
-}
+MAX_BULK_RATINGS = 200
 
 @app.post("/reputation/rate")
 async def rate_reputation(req: RatingRequest):
-    database.update_rating(req.job_id, req.rating)
+    # Buffered in memory, flushed to SQLite in batches
+    votes.record(req.job_id, req.rating)
     return {
         "status": "ok",
         "job_id": req.job_id,
         "rating": req.rating
     }
 
+@app.get("/reputation/rate")
+async def get_reputations(job_ids: List[str] = Query(...)):
+    # Accept both ?job_ids=a&job_ids=b and ?job_ids=a,b
+    ids = list(dict.fromkeys(j.strip() for raw in job_ids for j in raw.split(",") if j.strip()))
+    if len(ids) > MAX_BULK_RATINGS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_RATINGS} job ids per request")
+    ratings = await votes.get_many(ids)
+    return {
+        "status": "ok",
+        "ratings": ratings
+    }
+
 @app.get("/reputation/rate/{job_id}")
 async def get_reputation(job_id: str):
-    data = database.get_rating(job_id)
+    data = await votes.get(job_id)
     return {
         "job_id": job_id,
         "up": data["up"],
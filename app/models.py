@@ -10,6 +10,15 @@ class CollectorData(BaseModel):
     market_data: Optional[dict] = None # Now includes: symbol, ath, atl, fdv, total_supply, circ_supply
     on_chain_data: Optional[dict] = None
     social_signals: Optional[List[str]] = None
+    docs: Optional[dict] = None # Crawled docs/whitepaper/audit/GitHub signals (see agents.crawler)
+    degraded_sources: List[str] = [] # Sources skipped or timed out under the request deadline
+
+class PreCheckSignals(BaseModel):
+    domain_age: str
+    docs_present: bool
+    contracts_found: bool
+    market_listed: bool
+    degraded_sources: List[str] = []
 
 class RiskAnalysis(BaseModel):
     risk_score: float
@@ -0,0 +1,117 @@
+import asyncio
+import logging
+import os
+from typing import Dict, List, Optional
+
+from app import cache, database
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL_SECONDS = float(os.getenv("REPUTATION_FLUSH_INTERVAL", "2.0"))
+# Bounds staleness when another worker's read races this worker's flush
+READ_CACHE_TTL = float(os.getenv("REPUTATION_CACHE_TTL", "30"))
+
+def _empty() -> Dict[str, int]:
+    return {"up": 0, "down": 0}
+
+class VoteAggregator:
+    """
+    Write-behind vote counter.
+    Votes are summed in memory and flushed to the reputation table in one
+    transaction per interval (and at shutdown). Reads merge the persisted
+    counts (held in the shared cache) with this worker's unflushed votes;
+    other workers' votes become visible once they flush.
+    """
+    def __init__(self, flush_interval: float = FLUSH_INTERVAL_SECONDS, cache_ttl: float = READ_CACHE_TTL):
+        self.flush_interval = flush_interval
+        self.cache_ttl = cache_ttl
+        self._pending: Dict[str, Dict[str, int]] = {}
+        self._flushing: Dict[str, Dict[str, int]] = {}
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def record(self, job_id: str, rating: str):
+        # Same contract as database.update_rating: anything but up/down is ignored
+        if rating not in ("up", "down"):
+            return
+        counts = self._pending.setdefault(job_id, _empty())
+        counts[rating] += 1
+
+    async def get_many(self, job_ids: List[str]) -> Dict[str, Dict[str, int]]:
+        known = await cache.aget_many("reputation", job_ids)
+        if any(job_id not in known for job_id in job_ids):
+            # Never cache a row read while a flush is rewriting it
+            async with self._flush_lock:
+                known = await cache.aget_many("reputation", job_ids)
+                missing = [job_id for job_id in job_ids if job_id not in known]
+                if missing:
+                    loaded = await asyncio.to_thread(database.get_ratings, missing)
+                    for job_id in missing:
+                        # Job ids without a reputation row are cached as unknown too
+                        entry = {**loaded[job_id], "known": True} if job_id in loaded else {**_empty(), "known": False}
+                        await cache.aset("reputation", job_id, entry, self.cache_ttl)
+                        known[job_id] = entry
+                return self._merge(job_ids, known)
+        return self._merge(job_ids, known)
+
+    def _merge(self, job_ids: List[str], persisted) -> Dict[str, Dict[str, int]]:
+        result = {}
+        for job_id in job_ids:
+            entry = persisted.get(job_id) or {}
+            merged = {"up": entry.get("up", 0), "down": entry.get("down", 0)}
+            if not entry.get("known"):
+                # The flush UPDATE drops votes for unknown jobs, so they are not shown either
+                result[job_id] = merged
+                continue
+            for extra in (self._flushing.get(job_id), self._pending.get(job_id)):
+                if extra:
+                    merged["up"] += extra["up"]
+                    merged["down"] += extra["down"]
+            result[job_id] = merged
+        return result
+
+    async def get(self, job_id: str) -> Dict[str, int]:
+        return (await self.get_many([job_id]))[job_id]
+
+    async def flush(self):
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            # Swap out the batch; votes arriving mid-flush start a new one
+            self._flushing, self._pending = self._pending, {}
+            batch = self._flushing
+            try:
+                await asyncio.to_thread(database.apply_rating_deltas, batch)
+            except Exception as e:
+                logger.error(f"Reputation flush failed, retrying next interval: {e}")
+                for job_id, counts in batch.items():
+                    pending = self._pending.setdefault(job_id, _empty())
+                    pending["up"] += counts["up"]
+                    pending["down"] += counts["down"]
+            else:
+                # Every worker re-reads flushed rows (UPDATE skips unknown job ids)
+                for job_id in batch:
+                    await cache.adelete("reputation", job_id)
+            finally:
+                self._flushing = {}
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+votes = VoteAggregator()
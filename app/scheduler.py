@@ -0,0 +1,164 @@
+"""
+Admission control and priority classes for /analyze.
+
+Paid and free requests are admitted through separate classes, each with its
+own concurrency limit and bounded queue. Under load free traffic is shed
+first: it is rejected once its own queue is full or as soon as paid requests
+start queueing. Payment verification, which decides the class, runs in a
+small class of its own so unverified claims of payment cannot bypass those
+limits. Rejections carry a Retry-After estimate.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+PAID = "paid"
+FREE = "free"
+VERIFY = "verify" # Payment verification before a request is classed
+
+PAID_CONCURRENCY = int(os.getenv("SCHED_PAID_CONCURRENCY", "16"))
+FREE_CONCURRENCY = int(os.getenv("SCHED_FREE_CONCURRENCY", "8"))
+PAID_MAX_QUEUE = int(os.getenv("SCHED_PAID_MAX_QUEUE", "64"))
+FREE_MAX_QUEUE = int(os.getenv("SCHED_FREE_MAX_QUEUE", "16"))
+VERIFY_CONCURRENCY = int(os.getenv("SCHED_VERIFY_CONCURRENCY", "4"))
+VERIFY_MAX_QUEUE = int(os.getenv("SCHED_VERIFY_MAX_QUEUE", "16"))
+# Free requests are turned away while at least this many paid requests are queued
+FREE_SHED_ON_PAID_QUEUE = int(os.getenv("SCHED_FREE_SHED_ON_PAID_QUEUE", "1"))
+
+SOCIAL_SEARCH_WORKERS = int(os.getenv("SOCIAL_SEARCH_WORKERS", "4"))
+
+WAIT_SAMPLES = 1000
+MIN_RETRY_AFTER = 1
+MAX_RETRY_AFTER = 60
+
+class Overloaded(Exception):
+    def __init__(self, priority: str, retry_after: int, reason: str):
+        super().__init__(reason)
+        self.priority = priority
+        self.retry_after = retry_after
+        self.reason = reason
+
+class PriorityClass:
+    def __init__(self, name: str, concurrency: int, max_queue: int):
+        self.name = name
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.active = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.waits = deque(maxlen=WAIT_SAMPLES)
+        self.service_time = 1.0 # EWMA of seconds per admitted request
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the running loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._semaphore
+
+    def retry_after(self) -> int:
+        # Time for the current queue to drain at the observed service rate
+        estimate = (self.queued + 1) * self.service_time / max(1, self.concurrency)
+        return int(min(MAX_RETRY_AFTER, max(MIN_RETRY_AFTER, round(estimate))))
+
+    def record_service(self, seconds: float):
+        self.service_time = 0.8 * self.service_time + 0.2 * seconds
+
+    def stats(self) -> dict:
+        waits = sorted(self.waits)
+        def pct(p):
+            return round(waits[min(len(waits) - 1, int(len(waits) * p))] * 1000, 1) if waits else 0.0
+        return {
+            "concurrency": self.concurrency,
+            "maxQueue": self.max_queue,
+            "active": self.active,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "waitMs": {"p50": pct(0.5), "p95": pct(0.95), "p99": pct(0.99), "max": pct(1.0)},
+            "serviceMs": round(self.service_time * 1000, 1)
+        }
+
+classes: Dict[str, PriorityClass] = {
+    PAID: PriorityClass(PAID, PAID_CONCURRENCY, PAID_MAX_QUEUE),
+    FREE: PriorityClass(FREE, FREE_CONCURRENCY, FREE_MAX_QUEUE),
+    VERIFY: PriorityClass(VERIFY, VERIFY_CONCURRENCY, VERIFY_MAX_QUEUE),
+}
+
+def classify(paid: bool) -> str:
+    return PAID if paid else FREE
+
+def _check_admission(cls: PriorityClass):
+    # Paid requests waiting means the service is overloaded: free traffic goes first
+    if cls.name == FREE and classes[PAID].queued >= FREE_SHED_ON_PAID_QUEUE:
+        raise Overloaded(cls.name, classes[PAID].retry_after(), "paid traffic queued")
+    if cls.queued == 0 and cls.active < cls.concurrency:
+        return False
+    if cls.queued >= cls.max_queue:
+        raise Overloaded(cls.name, cls.retry_after(), f"{cls.name} queue full")
+    return True
+
+@asynccontextmanager
+async def admit(priority: str, timeout: Optional[float] = None):
+    """
+    Holds a slot of `priority` for the duration of the block.
+    Raises Overloaded if the class cannot queue the request or no slot
+    frees up within `timeout` seconds.
+    """
+    cls = classes[priority]
+    if not _check_admission(cls):
+        await cls.semaphore.acquire() # Free slot, no queueing
+        waited = 0.0
+    else:
+        cls.queued += 1
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(cls.semaphore.acquire(), timeout)
+        except asyncio.TimeoutError:
+            raise Overloaded(priority, cls.retry_after(), f"{priority} queue wait exceeded the request deadline")
+        finally:
+            cls.queued -= 1
+        waited = time.monotonic() - started
+
+    cls.admitted += 1
+    cls.active += 1
+    cls.waits.append(waited)
+    started = time.monotonic()
+    try:
+        yield waited
+    finally:
+        cls.active -= 1
+        cls.record_service(time.monotonic() - started)
+        cls.semaphore.release()
+
+def reject(exc: Overloaded):
+    classes[exc.priority].rejected += 1
+    logger.warning(f"Rejected {exc.priority} request: {exc.reason} (retry after {exc.retry_after}s)")
+
+def stats() -> dict:
+    return {name: cls.stats() for name, cls in classes.items()}
+
+# Blocking social search runs here instead of the default executor, so a burst of
+# searches cannot starve other to_thread work
+_social_executor: Optional[ThreadPoolExecutor] = None
+
+def social_executor() -> ThreadPoolExecutor:
+    global _social_executor
+    if _social_executor is None:
+        _social_executor = ThreadPoolExecutor(max_workers=SOCIAL_SEARCH_WORKERS, thread_name_prefix="social-search")
+    return _social_executor
+
+def shutdown():
+    global _social_executor
+    if _social_executor is not None:
+        _social_executor.shutdown(wait=False, cancel_futures=True)
+        _social_executor = None
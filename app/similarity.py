@@ -0,0 +1,135 @@
+"""
+Near-duplicate project detection.
+
+Landing pages are reduced to a MinHash signature over word shingles of the
+scraped text plus tag n-grams of the page structure. Signatures are banded
+for LSH and stored in SQLite as analyses are persisted, so the index grows
+incrementally and is shared by all workers. A lookup is one indexed query on
+the band buckets followed by a signature comparison of the few candidates.
+"""
+import hashlib
+import logging
+import os
+import random
+import re
+from typing import List, Optional
+
+from app import database
+
+logger = logging.getLogger(__name__)
+
+NUM_PERM = 64
+BANDS = 16 # 16 bands x 4 rows: candidates from roughly 50% similarity
+ROWS = NUM_PERM // BANDS
+TEXT_SHINGLE_WORDS = 5
+STRUCTURE_SHINGLE_TAGS = 4
+MIN_TEXT_WORDS = 50 # Error pages and near-empty sites are not indexed
+
+SIMILARITY_THRESHOLD = float(os.getenv("SIMILARITY_THRESHOLD", "0.8"))
+# A clone takes over the original's scores but never looks safer than this
+# (a phishing copy of a reputable site must not inherit its LOW risk level)
+CLONE_MIN_RISK_SCORE = 0.7
+CLONE_MAX_CREDIBILITY_SCORE = 0.5
+
+_MERSENNE = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_rng = random.Random(1729) # Fixed seed: stored signatures must stay comparable
+_PERMUTATIONS = [(_rng.randrange(1, _MERSENNE), _rng.randrange(0, _MERSENNE)) for _ in range(NUM_PERM)]
+
+_WORD = re.compile(r"\w+")
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "little")
+
+def shingles(text: str, structure: str = "") -> set:
+    words = _WORD.findall(text.lower())
+    if len(words) < MIN_TEXT_WORDS:
+        return set()
+    result = {" ".join(words[i:i + TEXT_SHINGLE_WORDS]) for i in range(len(words) - TEXT_SHINGLE_WORDS + 1)}
+    tags = structure.split()
+    result.update("s|" + " ".join(tags[i:i + STRUCTURE_SHINGLE_TAGS]) for i in range(len(tags) - STRUCTURE_SHINGLE_TAGS + 1))
+    return result
+
+def signature(shingle_set: set) -> List[int]:
+    hashes = [_hash(s) for s in shingle_set]
+    return [min(((a * h + b) % _MERSENNE) & _MAX_HASH for h in hashes) for a, b in _PERMUTATIONS]
+
+def band_keys(sig: List[int]) -> List[str]:
+    keys = []
+    for band in range(BANDS):
+        rows = sig[band * ROWS:(band + 1) * ROWS]
+        keys.append(f"{band}:{hashlib.blake2b(repr(rows).encode(), digest_size=8).hexdigest()}")
+    return keys
+
+def estimate(sig_a: List[int], sig_b: List[int]) -> float:
+    # Fraction of equal MinHash slots estimates the Jaccard similarity
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / NUM_PERM
+
+def page_signature(raw_signals: dict) -> Optional[List[int]]:
+    shingle_set = shingles(raw_signals.get("text_content", ""), raw_signals.get("structure", ""))
+    return signature(shingle_set) if shingle_set else None
+
+def find_clone(sig: Optional[List[int]], project_key: str, project_url: str = "") -> Optional[dict]:
+    """
+    Best stored match at or above SIMILARITY_THRESHOLD from another project
+    (not the same URL under a different project type):
+    {"jobId", "projectUrl", "projectKey", "similarity"}.
+    """
+    if not sig:
+        return None
+    try:
+        candidates = database.find_signature_candidates(
+            band_keys(sig), exclude_project_key=project_key, exclude_project_url=project_url
+        )
+    except Exception as e:
+        logger.warning(f"Similarity lookup failed: {e}")
+        return None
+
+    best = None
+    for candidate in candidates:
+        similarity = estimate(sig, candidate["signature"])
+        if similarity >= SIMILARITY_THRESHOLD and (best is None or similarity > best["similarity"]):
+            best = {
+                "jobId": candidate["job_id"],
+                "projectUrl": candidate["project_url"],
+                "projectKey": candidate["project_key"],
+                "similarity": round(similarity, 3)
+            }
+    return best
+
+def clone_outputs(clone: dict) -> dict:
+    """
+    Risk and credibility outputs of the matched project (from find_clone) for the clone
+    to take over, flagged and scored no better than the CLONE_* limits ({} if unavailable).
+    Narrative and contradiction describe the original, so they are not taken over.
+    """
+    try:
+        stored = database.get_stage_outputs(clone["projectKey"])
+    except Exception as e:
+        logger.warning(f"Stage outputs unavailable for clone {clone['projectKey']}: {e}")
+        return {}
+
+    outputs = {}
+    if "risk" in stored:
+        risk = stored["risk"]["output"]
+        flag = f"Near-duplicate ({clone['similarity']:.0%}) of {clone['projectUrl']}"
+        outputs["risk"] = {**stored["risk"], "output": {
+            **risk,
+            "risk_score": max(risk["risk_score"], CLONE_MIN_RISK_SCORE),
+            "risk_flags": [flag] + [f for f in risk["risk_flags"] if f != flag]
+        }}
+    if "credibility" in stored:
+        credibility = stored["credibility"]["output"]
+        outputs["credibility"] = {**stored["credibility"], "output": {
+            **credibility,
+            "credibility_score": min(credibility["credibility_score"], CLONE_MAX_CREDIBILITY_SCORE)
+        }}
+    return outputs
+
+def add(job_id: str, project_url: str, project_key: str, sig: Optional[List[int]]):
+    if not sig:
+        return
+    try:
+        database.save_signature(job_id, project_url, project_key, sig, band_keys(sig))
+    except Exception as e:
+        logger.warning(f"Failed to index {project_url}: {e}")
@@ -0,0 +1,273 @@
+"""
+Record/replay of upstream traffic (CoinGecko, Aptos, search, OpenAI, x402).
+
+UPSTREAM_MODE=record captures every upstream request/response made while
+serving an /analyze request into one gzipped cassette per job under
+CASSETTE_DIR. UPSTREAM_MODE=replay serves those responses back (matched on
+method, URL and request body) with the recorded latency scaled by
+REPLAY_LATENCY_SCALE, so an analysis can be re-run offline and deterministically.
+
+Request headers (API keys) are never written to a cassette.
+"""
+import asyncio
+import base64
+import glob
+import gzip
+import hashlib
+import json
+import logging
+import os
+import time
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+LIVE = "live"
+RECORD = "record"
+REPLAY = "replay"
+
+UPSTREAM_MODE = os.getenv("UPSTREAM_MODE", LIVE)
+CASSETTE_DIR = os.getenv("CASSETTE_DIR", "cassettes")
+REPLAY_LATENCY_SCALE = float(os.getenv("REPLAY_LATENCY_SCALE", "1.0")) # 0 replays without delay
+
+CASSETTE_VERSION = 2
+KEPT_RESPONSE_HEADERS = ("content-type",)
+# Upstream base URLs in effect while recording; replay must use the same ones to match
+UPSTREAM_SETTINGS = (
+    "COINGECKO_API_URL", "APTOS_NODE_URL", "APTOS_TESTNET_URL", "OPENAI_BASE_URL", "SEARCH_API_URL", "GITHUB_API_URL"
+)
+
+def enabled() -> bool:
+    return UPSTREAM_MODE in (RECORD, REPLAY)
+
+def _body_hash(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()[:16] if body else ""
+
+def _normalize_url(url: str) -> str:
+    # Query parameter order must not affect matching
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, query, ""))
+
+def _match_key(method: str, url: str, body_hash: str) -> Tuple[str, str, str]:
+    return method.upper(), _normalize_url(url), body_hash
+
+def _encode_body(content: bytes) -> dict:
+    try:
+        return {"body": content.decode("utf-8")}
+    except UnicodeDecodeError:
+        return {"body_b64": base64.b64encode(content).decode("ascii")}
+
+def _decode_body(interaction: dict) -> bytes:
+    if "body_b64" in interaction:
+        return base64.b64decode(interaction["body_b64"])
+    return interaction.get("body", "").encode("utf-8")
+
+# --- Recording ---
+
+class Cassette:
+    def __init__(self):
+        self.started_at = time.time()
+        self.request: Optional[dict] = None
+        self.upstream = {k: os.environ[k] for k in UPSTREAM_SETTINGS if k in os.environ}
+        self.interactions: List[dict] = []
+
+    def add(self, interaction: dict):
+        self.interactions.append(interaction)
+
+    def to_dict(self, job_id: str, status: Optional[int] = None) -> dict:
+        return {
+            "version": CASSETTE_VERSION,
+            "job_id": job_id,
+            "recorded_at": self.started_at,
+            "request": self.request,
+            "status": status,
+            "upstream": self.upstream,
+            "interactions": self.interactions
+        }
+
+_current: ContextVar[Optional[Cassette]] = ContextVar("cassette", default=None)
+
+def start(request: Optional[dict] = None) -> Optional[Cassette]:
+    """
+    Starts recording upstream traffic for the current request (record mode only).
+    `request` is the /analyze payload, stored so the job can be re-issued on replay.
+    """
+    if UPSTREAM_MODE != RECORD:
+        return None
+    cassette = Cassette()
+    cassette.request = request
+    _current.set(cassette)
+    return cassette
+
+async def finish(job_id: str, status: Optional[int] = None) -> Optional[str]:
+    """
+    Writes the current request's cassette as CASSETTE_DIR/<job_id>.json.gz.
+    `status` is the response status, checked against the replayed one.
+    """
+    cassette = _current.get()
+    _current.set(None)
+    if cassette is None or not cassette.interactions:
+        return None
+    path = os.path.join(CASSETTE_DIR, f"{job_id}.json.gz")
+    try:
+        await asyncio.to_thread(_write, path, cassette.to_dict(job_id, status))
+        logger.info(f"Recorded {len(cassette.interactions)} upstream calls to {path}")
+        return path
+    except Exception as e:
+        logger.warning(f"Failed to write cassette {path}: {e}")
+        return None
+
+def _write(path: str, payload: dict):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        json.dump(payload, f, separators=(",", ":"))
+
+def load(path: str) -> dict:
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+def restore_upstream(data: dict) -> Dict[str, str]:
+    """
+    Puts a cassette's recorded upstream base URLs into os.environ.
+    Must run before the app modules that read them are imported.
+    """
+    settings = data.get("upstream") or {}
+    os.environ.update(settings)
+    return settings
+
+# --- Replay ---
+
+class ReplayIndex:
+    """
+    Recorded responses from every cassette in a directory, keyed by request.
+    Repeated identical requests get the recorded responses in order, then cycle.
+    """
+    def __init__(self, directory: str):
+        self.responses: Dict[Tuple[str, str, str], List[dict]] = {}
+        self._next: Dict[Tuple[str, str, str], int] = {}
+        paths = sorted(glob.glob(os.path.join(directory, "*.json.gz")))
+        for path in paths:
+            try:
+                for interaction in load(path)["interactions"]:
+                    key = _match_key(interaction["method"], interaction["url"], interaction.get("request_hash", ""))
+                    self.responses.setdefault(key, []).append(interaction)
+            except Exception as e:
+                logger.warning(f"Skipping unreadable cassette {path}: {e}")
+        logger.info(f"Replay index: {sum(len(v) for v in self.responses.values())} responses from {len(paths)} cassettes")
+
+    def next(self, key: Tuple[str, str, str]) -> Optional[dict]:
+        recorded = self.responses.get(key)
+        if not recorded:
+            return None
+        i = self._next.get(key, 0)
+        self._next[key] = i + 1
+        return recorded[i % len(recorded)]
+
+_index: Optional[ReplayIndex] = None
+
+def get_index() -> ReplayIndex:
+    global _index
+    if _index is None:
+        _index = ReplayIndex(CASSETTE_DIR)
+    return _index
+
+async def _replay_delay(interaction: dict):
+    delay = interaction.get("latency_ms", 0) / 1000 * REPLAY_LATENCY_SCALE
+    if delay > 0:
+        await asyncio.sleep(delay)
+
+# --- httpx transport ---
+
+def transport(inner: Optional["httpx.AsyncBaseTransport"] = None) -> "httpx.AsyncBaseTransport":
+    """
+    Transport for the shared httpx client and the OpenAI client: records or replays
+    according to UPSTREAM_MODE (passes through to `inner` when live).
+    """
+    import httpx
+
+    inner = inner or httpx.AsyncHTTPTransport()
+    if UPSTREAM_MODE == LIVE:
+        return inner
+
+    class CassetteTransport(httpx.AsyncBaseTransport):
+        async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+            body = await request.aread()
+            key = _match_key(request.method, str(request.url), _body_hash(body))
+
+            if UPSTREAM_MODE == REPLAY:
+                interaction = get_index().next(key)
+                if interaction is None:
+                    raise httpx.ConnectError(f"No recorded response for {request.method} {request.url}", request=request)
+                await _replay_delay(interaction)
+                return httpx.Response(
+                    interaction["status"],
+                    headers=interaction.get("headers", {}),
+                    content=_decode_body(interaction),
+                    request=request
+                )
+
+            started = time.perf_counter()
+            response = await inner.handle_async_request(request)
+            try:
+                content = await response.aread()
+            finally:
+                await response.aclose()
+            latency_ms = (time.perf_counter() - started) * 1000
+
+            headers = {k: v for k, v in response.headers.items() if k.lower() in KEPT_RESPONSE_HEADERS}
+            cassette = _current.get()
+            if cassette is not None:
+                cassette.add({
+                    "method": key[0],
+                    "url": key[1],
+                    "request_hash": key[2],
+                    "status": response.status_code,
+                    "headers": headers,
+                    "latency_ms": round(latency_ms, 1),
+                    **_encode_body(content)
+                })
+            # Body already decoded, so the original content-encoding no longer applies
+            return httpx.Response(response.status_code, headers=headers, content=content, request=request)
+
+        async def aclose(self):
+            await inner.aclose()
+
+    return CassetteTransport()
+
+# --- Non-HTTP upstreams (blocking libraries such as googlesearch) ---
+
+async def call(name: str, key: Any, compute: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Records/replays the JSON-serializable result of an upstream call made outside httpx.
+    """
+    if UPSTREAM_MODE == LIVE:
+        return await compute()
+
+    url = f"call://{name}"
+    request_hash = _body_hash(json.dumps(key, sort_keys=True, default=str).encode())
+    if UPSTREAM_MODE == REPLAY:
+        interaction = get_index().next(_match_key("CALL", url, request_hash))
+        if interaction is None:
+            raise LookupError(f"No recorded result for {name} {key!r}")
+        await _replay_delay(interaction)
+        return json.loads(interaction["body"])
+
+    started = time.perf_counter()
+    result = await compute()
+    cassette = _current.get()
+    if cassette is not None:
+        cassette.add({
+            "method": "CALL",
+            "url": url,
+            "request_hash": request_hash,
+            "status": 200,
+            "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+            "body": json.dumps(result, default=str)
+        })
+    return result
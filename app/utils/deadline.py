@@ -0,0 +1,83 @@
+import asyncio
+import os
+import time
+from contextvars import ContextVar
+from typing import Any, Awaitable, Dict, Optional
+
+# Per-tier request budgets (seconds). Paid requests may override up to
+# MAX_DEADLINE_SECONDS; free requests may only shorten their budget.
+FREE_DEADLINE_SECONDS = float(os.getenv("DEADLINE_FREE_SECONDS", "8"))
+PAID_DEADLINE_SECONDS = float(os.getenv("DEADLINE_PAID_SECONDS", "45"))
+MAX_DEADLINE_SECONDS = float(os.getenv("DEADLINE_MAX_SECONDS", "120"))
+MIN_STAGE_SECONDS = 0.05 # Below this a stage is skipped rather than started
+
+TIMED_OUT = "timed_out"
+SKIPPED = "skipped"
+
+class Deadline:
+    def __init__(self, budget_seconds: float):
+        self.budget = budget_seconds
+        self.expires_at = time.monotonic() + budget_seconds
+        self.outcomes: Dict[str, str] = {}
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+_current: ContextVar[Optional[Deadline]] = ContextVar("deadline", default=None)
+
+def budget_for(paid: bool, override_ms: Optional[int] = None) -> float:
+    if override_ms:
+        cap = MAX_DEADLINE_SECONDS if paid else FREE_DEADLINE_SECONDS
+        return min(max(override_ms / 1000, MIN_STAGE_SECONDS), cap)
+    return PAID_DEADLINE_SECONDS if paid else FREE_DEADLINE_SECONDS
+
+def start(budget_seconds: float) -> Deadline:
+    """
+    Starts the deadline for the current request/task.
+    """
+    deadline = Deadline(budget_seconds)
+    _current.set(deadline)
+    return deadline
+
+def current() -> Optional[Deadline]:
+    return _current.get()
+
+def mark(stage: str, outcome: str):
+    deadline = _current.get()
+    if deadline is not None:
+        deadline.outcomes.setdefault(stage, outcome)
+
+async def run_stage(stage: str, aw: Awaitable, default: Any = None, share: float = 1.0) -> Any:
+    """
+    Awaits `aw` within `share` of the remaining request budget.
+    On timeout (or no budget left) records the stage and returns `default`.
+    """
+    deadline = _current.get()
+    if deadline is None:
+        return await aw
+
+    budget = deadline.remaining() * share
+    if budget < MIN_STAGE_SECONDS:
+        if asyncio.iscoroutine(aw):
+            aw.close() # Never started
+        mark(stage, SKIPPED)
+        return default
+    try:
+        return await asyncio.wait_for(aw, budget)
+    except asyncio.TimeoutError:
+        mark(stage, TIMED_OUT)
+        return default
+
+def report() -> Optional[dict]:
+    """
+    Degradation summary for the response (None when every stage completed).
+    """
+    deadline = _current.get()
+    if deadline is None or not deadline.outcomes:
+        return None
+    return {
+        "partial": True,
+        "deadlineMs": int(deadline.budget * 1000),
+        "timedOut": [s for s, o in deadline.outcomes.items() if o == TIMED_OUT],
+        "skipped": [s for s, o in deadline.outcomes.items() if o == SKIPPED]
+    }
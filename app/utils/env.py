@@ -0,0 +1,20 @@
+import os
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_loaded = False
+
+def load_env():
+    """
+    Loads .env once, before module-level settings are read.
+    python-dotenv is only imported when a .env file actually exists
+    (PaaS deploys configure the environment directly).
+    """
+    global _loaded
+    if _loaded:
+        return
+    _loaded = True
+    for path in (os.path.join(os.getcwd(), ".env"), os.path.join(_ROOT, ".env")):
+        if os.path.exists(path):
+            from dotenv import load_dotenv
+            load_dotenv(path)
+            return
@@ -0,0 +1,26 @@
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    import httpx
+
+# One pooled client for all upstreams (created on first use, closed at shutdown)
+_client: Optional["httpx.AsyncClient"] = None
+
+def get_client() -> "httpx.AsyncClient":
+    global _client
+    if _client is None:
+        import httpx
+        from app.utils import cassette
+        limits = httpx.Limits(max_connections=100, max_keepalive_connections=20)
+        # Records/replays upstream traffic when UPSTREAM_MODE is set
+        _client = httpx.AsyncClient(
+            timeout=5.0,
+            transport=cassette.transport(httpx.AsyncHTTPTransport(limits=limits))
+        )
+    return _client
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -0,0 +1,40 @@
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse, Response
+
+try:
+    import orjson
+except ImportError: # Optional speed-up; stdlib json is the fallback
+    orjson = None
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered with orjson when installed (compact stdlib json otherwise).
+    Content must already be plain JSON types (use model_dump(), not models).
+    """
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+class RawJSONResponse(Response):
+    """
+    Serves already-encoded JSON text/bytes as-is (no parse, no re-encode).
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return content.encode("utf-8") if isinstance(content, str) else content
+
+def splice_json_object(prefix: dict, stored_json: str) -> str:
+    """
+    Prepends top-level keys to a stored JSON object without parsing it.
+    """
+    if not prefix:
+        return stored_json
+    head = json.dumps(prefix, separators=(",", ":"))[:-1] # Drop the closing brace
+    body = stored_json.lstrip()[1:].lstrip()
+    if body.startswith("}"):
+        return head + body
+    return f"{head},{body}"
@@ -0,0 +1,52 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+# Per-request stage timings (ms), exposed to clients via the Server-Timing header
+_stages: ContextVar[Optional[Dict[str, float]]] = ContextVar("stage_timings", default=None)
+
+def start_request() -> Dict[str, float]:
+    """
+    Starts a fresh stage recorder for the current request/task.
+    """
+    stages: Dict[str, float] = {}
+    _stages.set(stages)
+    return stages
+
+@contextmanager
+def stage(name: str):
+    """
+    Records the wall time spent inside the block under `name`.
+    Safe to use around awaits; a no-op outside of a request.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stages = _stages.get()
+        if stages is not None:
+            elapsed = (time.perf_counter() - start) * 1000
+            stages[name] = stages.get(name, 0.0) + elapsed
+
+def server_timing_header(stages: Dict[str, float]) -> str:
+    """
+    Formats stage timings as a Server-Timing header value.
+    """
+    return ", ".join(f"{name};dur={dur:.2f}" for name, dur in stages.items())
+
+def parse_server_timing(header: str) -> Dict[str, float]:
+    """
+    Inverse of server_timing_header (used by the benchmark harness).
+    """
+    stages = {}
+    for part in header.split(","):
+        part = part.strip()
+        if not part or ";dur=" not in part:
+            continue
+        name, dur = part.split(";dur=", 1)
+        try:
+            stages[name.strip()] = float(dur)
+        except ValueError:
+            continue
+    return stages
@@ -1,16 +1,17 @@
-import httpx
 import logging
+import os
+from app import cache
+from app.utils.http import get_client
 
 logger = logging.getLogger(__name__)
 
-# Basic logging config if not already set
-logging.basicConfig(level=logging.INFO)
-
 # Constants from Cheatsheet
-APTOS_TESTNET_URL = "https://api.testnet.aptoslabs.com/v1"
+APTOS_TESTNET_URL = os.getenv("APTOS_TESTNET_URL", "https://api.testnet.aptoslabs.com/v1")
 PAYMENT_RECIPIENT = "0x701b1d24270dd314d417430fbc2fc5407c4119aa7a94bc3d467d94952f9bc6cc" # Wallet 1
 REQUIRED_AMOUNT_APT = 0.01
 REQUIRED_AMOUNT_OCTAS = int(REQUIRED_AMOUNT_APT * 100_000_000)
+PAYMENT_CACHE_TTL = 7 * 24 * 3600 # A confirmed transfer stays valid
+PAYMENT_FAILURE_TTL = 15 # Short: a fresh transaction may not be indexed yet
 
 async def verify_payment(tx_hash: str) -> bool:
     """
@@ -27,8 +28,7 @@ async def verify_payment(tx_hash: str) -> bool:
         return True
 
     try:
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(f"{APTOS_TESTNET_URL}/transactions/by_hash/{tx_hash}")
+        resp = await get_client().get(f"{APTOS_TESTNET_URL}/transactions/by_hash/{tx_hash}")
             
         if resp.status_code != 200:
             logger.warning(f"Tx {tx_hash} not found or error: {resp.text}")
@@ -83,3 +83,19 @@ async def verify_payment(tx_hash: str) -> bool:
     except Exception as e:
         logger.error(f"Error verifying tx {tx_hash}: {e}")
         return False
+
+async def verify_payment_cached(tx_hash: str) -> bool:
+    """
+    verify_payment, remembering verified hashes so repeat requests skip the node lookup.
+    Failed verifications are remembered for PAYMENT_FAILURE_TTL only.
+    """
+    if not tx_hash:
+        return False
+
+    async def verify() -> bool:
+        verified = await verify_payment(tx_hash)
+        if not verified:
+            await cache.aset("payments", tx_hash, False, PAYMENT_FAILURE_TTL)
+        return verified
+
+    return await cache.get_or_compute("payments", tx_hash, PAYMENT_CACHE_TTL, verify, cache_if=bool)
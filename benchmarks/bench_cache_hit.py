@@ -0,0 +1,144 @@
+"""
+Cache-hit serving micro-benchmark.
+
+1. Serialization only: the old path (json.loads the stored report, rebuild the
+   response dict, jsonable_encoder, JSONResponse) against the current one
+   (stored JSON text served as-is).
+2. End to end: requests per second on the /analyze cache-hit path over ASGI,
+   using the "demo" payment hash so no upstream is involved, for the old
+   handler (uncached SQLite read, json.loads, re-encode through JSONResponse)
+   and the current app.
+
+    python -m benchmarks.bench_cache_hit --iterations 20000 --requests 2000
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+def sample_report() -> dict:
+    rules = [{"rule_id": f"RULE_{i}", "status": "WARN", "reason": "Volume/Mcap ratio < 1% (Ghost Chain)", "source": "CoinGecko"} for i in range(6)]
+    return {
+        "status": "ok",
+        "preCheck": {"age": "Auto-Detected", "liquidity": "Listed (CoinGecko)", "socialMentions": "High", "contractVerified": True},
+        "report": {
+            "riskScore": 35,
+            "riskLevel": "MEDIUM",
+            "summary": "Liquidity is moderate relative to market cap. " * 4,
+            "investmentAdvice": "Fundamental Assessment: Structural Assessment Finalized.",
+            "auditDetails": [f"Signal {i}: documentation and audit coverage" for i in range(12)],
+            "riskFlags": [f"Flag {i}: team partially anonymous" for i in range(6)],
+            "positiveSignals": [f"Signal {i}: documentation and audit coverage" for i in range(6)],
+            "marketData": None,
+            "financialAnalysis": None,
+            "ruleResults": rules,
+            "agentConflict": {"has_conflict": False, "reason": ""},
+            "narrative": "Liquidity depth is moderate. FDV is 2.5x market cap. Documentation is present. " * 3,
+        },
+        "jobId": "agent-bench01",
+    }
+
+def bench_serialization(iterations: int):
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from app.utils.responses import RawJSONResponse
+
+    stored = json.dumps(sample_report())
+    job_id = "agent-bench01"
+
+    def before():
+        report = json.loads(stored)
+        body = {"status": "ok", "preCheck": report["preCheck"], "report": report["report"], "jobId": job_id}
+        return JSONResponse(jsonable_encoder(body)).body
+
+    def after():
+        return RawJSONResponse(stored).body
+
+    assert json.loads(before()) == json.loads(after())
+    for name, fn in (("before (parse + re-encode)", before), ("after (raw splice)", after)):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        elapsed = time.perf_counter() - started
+        print(f"   {name:<28} {iterations / elapsed:>10.0f} ops/s  ({elapsed / iterations * 1e6:.1f} us/op)")
+
+def legacy_app():
+    """
+    The cache-hit path as it was before zero-parse serving, on its own FastAPI app.
+    """
+    import sqlite3
+    from fastapi import FastAPI
+    from app import database
+    from app.main import AnalyzeRequest
+    from app.utils import x402
+
+    legacy = FastAPI()
+
+    @legacy.post("/analyze")
+    async def analyze(request: AnalyzeRequest):
+        if request.payment_tx_hash and await x402.verify_payment(request.payment_tx_hash):
+            conn = sqlite3.connect(database.DB_PATH)
+            conn.row_factory = sqlite3.Row
+            row = conn.execute('SELECT * FROM analyses WHERE project_url = ? ORDER BY created_at DESC LIMIT 1', (request.project_url,)).fetchone()
+            conn.close()
+            if row:
+                report = json.loads(row["report_json"])
+                return {"status": "ok", "preCheck": report["preCheck"], "report": report["report"], "jobId": row["job_id"]}
+        return {"status": "miss"}
+
+    return legacy
+
+async def _requests_per_second(app, body: dict, requests: int, concurrency: int) -> float:
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        resp = await client.post("/analyze", json=body)
+        assert resp.status_code == 200 and resp.json()["jobId"] == "agent-bench01", resp.text
+
+        remaining = requests
+
+        async def worker():
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                await client.post("/analyze", json=body)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return requests / (time.perf_counter() - started)
+
+async def bench_endpoint(requests: int, concurrency: int):
+    from app import database
+    from app.main import app
+
+    url = "https://bench.example/cached"
+    body = {"project_url": url, "project_type": "Token", "wallet_address": "0xbench", "payment_tx_hash": "demo"}
+    async with app.router.lifespan_context(app):
+        database.save_analysis("agent-bench01", url, "Token", "0xbench", sample_report())
+        before = await _requests_per_second(legacy_app(), body, requests, concurrency)
+        after = await _requests_per_second(app, body, requests, concurrency)
+    print(f"   before (legacy handler):  {before:>8.0f} req/s over {requests} requests (concurrency {concurrency})")
+    print(f"   after (current /analyze): {after:>8.0f} req/s ({after / before:.2f}x)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Cache-hit serving micro-benchmark")
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="aptoseidon-cachehit-")
+    os.environ.setdefault("APTOSEIDON_DB_PATH", os.path.join(workdir, "bench.db"))
+    os.environ.setdefault("CACHE_DB_PATH", os.path.join(workdir, "cache.db"))
+
+    print("serialization:")
+    bench_serialization(args.iterations)
+    print("endpoint:")
+    asyncio.run(bench_endpoint(args.requests, args.concurrency))
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""
+Docs crawl against the static site fixture (benchmarks/fixtures/site).
+
+Scrapes stub landing pages, then crawls their docs/whitepaper/audit/GitHub
+links concurrently, prints the extracted signals, bytes fetched, wall time and
+the peak number of concurrent crawl requests the site stub saw, and checks them
+against the fixture:
+
+- audit firms OtterSec and Zellic, the six-row allocation table, 20% to
+  team and advisors, vesting mentioned;
+- with --byte-budget, no project fetches more than the budget;
+- the site stub never sees more than CRAWL_PER_HOST concurrent crawl requests.
+
+    python -m benchmarks.bench_crawl --projects 8 --latency site=100
+    python -m benchmarks.bench_crawl --byte-budget 2000     # budget truncation
+
+Exits non-zero when a check fails.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+from benchmarks.stubs import FIXTURE_DIR, FIXTURE_PAGES, StubFleet, add_stub_arguments, build_configs
+
+EXPECTED_AUDIT_FIRMS = ["OtterSec", "Zellic"]
+EXPECTED_ALLOCATION = {
+    "Community incentives": 40.0, "Treasury": 20.0, "Team": 15.0,
+    "Investors": 15.0, "Advisors": 5.0, "Liquidity": 5.0
+}
+EXPECTED_TEAM_PCT = 20.0 # Team + Advisors
+
+async def crawl_projects(fleet: StubFleet, projects: int) -> list:
+    from app.agents import collector, crawler
+    from app.utils import http
+
+    try:
+        # Landing pages first, so the site stub's peak below counts crawl requests only
+        pages = await asyncio.gather(*(collector.scrape_page(fleet.site_url(f"crawl-{i}")) for i in range(projects)))
+        fleet.reset_peaks()
+
+        async def one(page: dict) -> dict:
+            started = time.perf_counter()
+            docs = await crawler.crawl(page.get("doc_links", []))
+            return {"ms": (time.perf_counter() - started) * 1000, "links": len(page.get("doc_links", [])), "docs": docs}
+
+        return await asyncio.gather(*(one(page) for page in pages))
+    finally:
+        await http.close_client()
+
+def check(results: list, site: dict, per_host: int, byte_budget) -> list:
+    failures = []
+    fixture_bytes = sum(os.path.getsize(os.path.join(FIXTURE_DIR, f)) for f in FIXTURE_PAGES.values())
+    for i, result in enumerate(results):
+        docs = result["docs"]
+        if not docs:
+            failures.append(f"project {i}: nothing crawled")
+            continue
+        if byte_budget is not None:
+            # Truncated pages are expected here, so only the budget is checked
+            if docs["bytes_fetched"] > byte_budget:
+                failures.append(f"project {i}: fetched {docs['bytes_fetched']} bytes over a {byte_budget} byte budget")
+            elif byte_budget < fixture_bytes and docs["bytes_fetched"] != byte_budget:
+                failures.append(f"project {i}: fetched {docs['bytes_fetched']} bytes, expected the whole {byte_budget} byte budget")
+            continue
+        if docs["audit_firms"] != EXPECTED_AUDIT_FIRMS:
+            failures.append(f"project {i}: audit_firms {docs['audit_firms']}")
+        if docs["token_allocation"] != EXPECTED_ALLOCATION:
+            failures.append(f"project {i}: token_allocation {docs['token_allocation']}")
+        if docs["team_allocation_pct"] != EXPECTED_TEAM_PCT:
+            failures.append(f"project {i}: team_allocation_pct {docs['team_allocation_pct']}")
+        if not docs["vesting_mentioned"]:
+            failures.append(f"project {i}: vesting not detected")
+    if site["max_in_flight"] > per_host:
+        failures.append(f"site stub saw {site['max_in_flight']} concurrent crawl requests (CRAWL_PER_HOST={per_host})")
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description="Docs crawl benchmark")
+    add_stub_arguments(parser)
+    parser.add_argument("--projects", type=int, default=4, help="Landing pages crawled concurrently")
+    parser.add_argument("--byte-budget", type=int, help="Overrides CRAWL_BYTE_BUDGET")
+    parser.add_argument("--per-host", type=int, help="Overrides CRAWL_PER_HOST")
+    args = parser.parse_args()
+
+    fleet = StubFleet(build_configs(args.latency, args.jitter, args.error_rate), seed=args.seed).start()
+    try:
+        # Crawler settings are read at import, so set them first
+        os.environ.update(fleet.env())
+        if args.byte_budget is not None:
+            os.environ["CRAWL_BYTE_BUDGET"] = str(args.byte_budget)
+        if args.per_host is not None:
+            os.environ["CRAWL_PER_HOST"] = str(args.per_host)
+        results = asyncio.run(crawl_projects(fleet, args.projects))
+        site = fleet.stats()["site"]
+    finally:
+        fleet.stop()
+
+    from app.agents import crawler
+    sample = results[0]["docs"] or {}
+    print("signals (first project):")
+    print(json.dumps({k: v for k, v in sample.items() if k != "excerpt"}, indent=2))
+    times = [r["ms"] for r in results]
+    fetched = [r["docs"]["bytes_fetched"] for r in results if r["docs"]]
+    print(f"projects: {len(results)}, links per project: {results[0]['links']}")
+    print(f"crawl ms: median {statistics.median(times):.1f}, max {max(times):.1f}")
+    print(f"bytes fetched per project: median {statistics.median(fetched) if fetched else 0:.0f}")
+    print(f"site stub: {site['requests']} requests, peak {site['max_in_flight']} concurrent crawl requests")
+
+    failures = check(results, site, crawler.CRAWL_PER_HOST, args.byte_budget)
+    if failures:
+        print("FAIL: " + "; ".join(failures))
+        return 1
+    print("OK: signals match the fixture, byte budget and per-host limit respected")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
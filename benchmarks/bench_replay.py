@@ -0,0 +1,135 @@
+"""
+Deterministic offline replay of recorded /analyze jobs.
+
+Record cassettes against the local stubs (or use ones recorded in production
+with UPSTREAM_MODE=record), then replay them with no network access:
+
+    python -m benchmarks.bench_replay record --requests 20 --cassettes /tmp/cassettes
+    python -m benchmarks.bench_replay replay --cassettes /tmp/cassettes --latency-scale 1.0
+
+Replay restores the upstream base URLs recorded in the cassettes, re-issues the
+/analyze request stored in each one against a fresh database and cache, serves
+every upstream call from the cassettes, and reports latency percentiles and the
+per-stage breakdown from Server-Timing. It exits non-zero when a replayed job
+gets a different response status than the recorded one.
+"""
+import argparse
+import asyncio
+import glob
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+def _fresh_storage():
+    workdir = tempfile.mkdtemp(prefix="aptoseidon-replay-")
+    os.environ["APTOSEIDON_DB_PATH"] = os.path.join(workdir, "bench.db")
+    os.environ["CACHE_DB_PATH"] = os.path.join(workdir, "cache.db")
+
+async def _post_all(payloads: List[dict], concurrency: int) -> Dict[str, list]:
+    import httpx
+    from app.main import app
+    from app.utils import timing
+
+    latencies: List[float] = []
+    stages: Dict[str, List[float]] = {}
+    statuses: Dict[int, int] = {}
+    codes: List[int] = [0] * len(payloads) # Response status per payload, in order
+    queue = asyncio.Queue()
+    for i, payload in enumerate(payloads):
+        queue.put_nowait((i, payload))
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300.0) as client:
+            async def worker():
+                while not queue.empty():
+                    i, payload = queue.get_nowait()
+                    started = time.perf_counter()
+                    resp = await client.post("/analyze", json=payload)
+                    latencies.append((time.perf_counter() - started) * 1000)
+                    codes[i] = resp.status_code
+                    statuses[resp.status_code] = statuses.get(resp.status_code, 0) + 1
+                    for name, dur in timing.parse_server_timing(resp.headers.get("server-timing", "")).items():
+                        stages.setdefault(name, []).append(dur)
+
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return {"latencies": latencies, "stages": stages, "statuses": statuses, "codes": codes}
+
+def record(args):
+    from benchmarks.load import Scenario
+    from benchmarks.stubs import StubFleet
+
+    fleet = StubFleet().start()
+    try:
+        os.environ.update(fleet.env())
+        os.environ["UPSTREAM_MODE"] = "record"
+        os.environ["CASSETTE_DIR"] = args.cassettes
+        _fresh_storage()
+        scenario = Scenario("paid", fleet, args.project_type)
+        result = asyncio.run(_post_all([scenario.payload() for _ in range(args.requests)], args.concurrency))
+    finally:
+        fleet.stop()
+    print(f"recorded {len(glob.glob(os.path.join(args.cassettes, '*.json.gz')))} cassettes in {args.cassettes} (statuses={result['statuses']})")
+
+def replay(args):
+    from benchmarks.load import summarize
+
+    os.environ["UPSTREAM_MODE"] = "replay"
+    os.environ["CASSETTE_DIR"] = args.cassettes
+    os.environ["REPLAY_LATENCY_SCALE"] = str(args.latency_scale)
+    _fresh_storage()
+
+    from app.utils import cassette
+    jobs, payloads, recorded_upstream_ms, upstream = [], [], [], None
+    for path in sorted(glob.glob(os.path.join(args.cassettes, "*.json.gz"))):
+        data = cassette.load(path)
+        if not data.get("request"):
+            continue
+        # Recorded URLs only match under the upstream settings they were recorded with
+        settings = data.get("upstream") or {}
+        if upstream is None:
+            upstream = cassette.restore_upstream(data)
+        elif settings != upstream:
+            print(f"Skipping {os.path.basename(path)}: recorded against different upstream URLs")
+            continue
+        jobs.append((data["job_id"], data.get("status")))
+        payloads.append(data["request"])
+        recorded_upstream_ms.append(sum(i.get("latency_ms", 0) for i in data["interactions"]))
+    if not payloads:
+        print(f"No replayable cassettes in {args.cassettes}")
+        return 1
+
+    result = asyncio.run(_post_all(payloads, args.concurrency))
+    summary = summarize(result["latencies"])
+    mismatches = [
+        (job_id, recorded, replayed)
+        for (job_id, recorded), replayed in zip(jobs, result["codes"])
+        if recorded is not None and recorded != replayed
+    ]
+    print(f"replayed {len(payloads)} jobs (latency scale {args.latency_scale}, statuses={result['statuses']})")
+    print(f"   latency ms: p50 {summary['p50']:.1f}  p95 {summary['p95']:.1f}  p99 {summary['p99']:.1f}  max {summary['max']:.1f}")
+    print(f"   recorded upstream time per job: {sum(recorded_upstream_ms) / len(recorded_upstream_ms):.1f} ms (sum of calls)")
+    for name, durations in sorted(result["stages"].items(), key=lambda kv: -sum(kv[1])):
+        stage = summarize(durations)
+        print(f"   {name:<14} p50 {stage['p50']:8.1f}  p95 {stage['p95']:8.1f}")
+    for job_id, recorded, replayed in mismatches:
+        print(f"   status mismatch for {job_id}: recorded {recorded}, replayed {replayed}")
+    if mismatches:
+        print(f"{len(mismatches)} of {len(payloads)} jobs replayed with a different status")
+        return 1
+
+def main():
+    parser = argparse.ArgumentParser(description="Record/replay benchmark")
+    parser.add_argument("mode", choices=["record", "replay"])
+    parser.add_argument("--cassettes", required=True, help="Cassette directory")
+    parser.add_argument("--requests", type=int, default=20, help="Jobs to record")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--project-type", default="Token")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Multiplier on recorded latencies (0 = none)")
+    args = parser.parse_args()
+    return record(args) if args.mode == "record" else replay(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
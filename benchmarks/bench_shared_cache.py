@@ -0,0 +1,142 @@
+"""
+Multi-process correctness and throughput check for the shared cache tier.
+
+Spawns several worker processes that race on the same keys through
+app.cache.get_or_compute (SQLite/WAL backend) and verifies that:
+
+- every key is computed exactly once across all workers, and
+- every worker observes the same value for every key.
+
+    python -m benchmarks.bench_shared_cache --workers 8 --keys 50
+
+Exits non-zero on a correctness failure or when a worker dies.
+"""
+import argparse
+import asyncio
+import multiprocessing as mp
+import os
+import queue
+import sqlite3
+import sys
+import tempfile
+import time
+import traceback
+
+COMPUTE_SECONDS = 0.05
+WORKER_TIMEOUT = 120
+
+def _record_compute(ledger: str, key: str, pid: int):
+    conn = sqlite3.connect(ledger, timeout=10.0)
+    conn.execute("INSERT INTO computes (key, pid) VALUES (?, ?)", (key, pid))
+    conn.commit()
+    conn.close()
+
+def _worker(cache_path: str, ledger: str, keys: int, start_at: float, out: mp.Queue):
+    os.environ["CACHE_BACKEND"] = "sqlite"
+    os.environ["CACHE_DB_PATH"] = cache_path
+    from app import cache
+
+    async def run():
+        pid = os.getpid()
+
+        async def one(i: int):
+            key = f"key-{i}"
+
+            async def compute():
+                _record_compute(ledger, key, pid)
+                await asyncio.sleep(COMPUTE_SECONDS) # Simulated upstream call
+                return {"key": key, "computed_by": pid}
+
+            return key, await cache.get_or_compute("bench", key, 300, compute, lease_ttl=10)
+
+        # Line all workers up so they hit cold keys together
+        await asyncio.sleep(max(0.0, start_at - time.time()))
+        started = time.perf_counter()
+        results = dict(await asyncio.gather(*(one(i) for i in range(keys))))
+        elapsed = time.perf_counter() - started
+
+        # Warm reads: pure cache hits
+        hit_started = time.perf_counter()
+        for i in range(keys):
+            cache.get("bench", f"key-{i}")
+        hit_elapsed = time.perf_counter() - hit_started
+        return results, elapsed, hit_elapsed
+
+    try:
+        out.put((os.getpid(), *asyncio.run(run())))
+    except BaseException:
+        out.put((os.getpid(), None, traceback.format_exc(), None))
+        raise
+
+def _collect(procs: list, out: mp.Queue) -> list:
+    """
+    One report per worker; stops early if a worker exits without reporting.
+    """
+    reports, deadline = [], time.monotonic() + WORKER_TIMEOUT
+    while len(reports) < len(procs) and time.monotonic() < deadline:
+        try:
+            reports.append(out.get(timeout=1.0))
+        except queue.Empty:
+            if not any(p.is_alive() for p in procs) and out.empty():
+                break
+    return reports
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared cache multi-worker check")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--keys", type=int, default=25)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="aptoseidon-cache-")
+    cache_path = os.path.join(tmp, "cache.db")
+    ledger = os.path.join(tmp, "ledger.db")
+    conn = sqlite3.connect(ledger)
+    conn.execute("CREATE TABLE computes (key TEXT, pid INTEGER)")
+    conn.commit()
+    conn.close()
+
+    ctx = mp.get_context("spawn")
+    out = ctx.Queue()
+    start_at = time.time() + 2.0 # Leaves time for interpreter startup
+    procs = [ctx.Process(target=_worker, args=(cache_path, ledger, args.keys, start_at, out)) for _ in range(args.workers)]
+    for p in procs:
+        p.start()
+    reports = _collect(procs, out)
+    for p in procs:
+        p.join(timeout=5)
+        if p.is_alive():
+            p.terminate()
+
+    crashed = [(pid, error) for pid, results, error, _ in reports if results is None]
+    for pid, error in crashed:
+        print(f"worker {pid} failed:\n{error}")
+    if crashed or len(reports) < len(procs):
+        print(f"FAIL: {len(procs) - len(reports) + len(crashed)} of {len(procs)} workers did not finish")
+        return 1
+
+    conn = sqlite3.connect(ledger)
+    counts = dict(conn.execute("SELECT key, COUNT(*) FROM computes GROUP BY key").fetchall())
+    conn.close()
+
+    failures = []
+    duplicated = {key: n for key, n in counts.items() if n != 1}
+    if duplicated or len(counts) != args.keys:
+        failures.append(f"compute counts off: {len(counts)} keys computed, duplicates={duplicated}")
+    reference = reports[0][1]
+    for pid, results, _, _ in reports[1:]:
+        if results != reference:
+            failures.append(f"worker {pid} saw different values")
+
+    for pid, _, elapsed, hit_elapsed in reports:
+        print(f"worker {pid}: cold {elapsed * 1000:.1f} ms for {args.keys} keys, warm {args.keys / hit_elapsed:.0f} gets/s")
+    naive = args.workers * args.keys
+    print(f"upstream computes: {sum(counts.values())} (without sharing: {naive})")
+
+    if failures:
+        print("FAIL: " + "; ".join(failures))
+        return 1
+    print("OK: each key computed once, all workers agree")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+"""
+Cold-start benchmark: import time of app.main and time-to-first-response.
+
+Each measurement runs in a fresh interpreter, like a scale-to-zero host:
+
+    python -m benchmarks.bench_startup --runs 5
+    python -m benchmarks.bench_startup --warmup     # same, with WARMUP=1
+
+Reports the median import time (plus the slowest direct imports of app.main from -X importtime)
+and, for a uvicorn process, the time until GET / answers and until the first
+pre-check /analyze request (which pays any lazily deferred imports) answers.
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+from benchmarks.stubs import StubFleet
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def measure_import() -> float:
+    code = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1]) * 1000
+
+def slowest_imports(limit: int, module: str = "app.main") -> list:
+    """
+    Direct imports of `module` (its dependencies and app submodules) by cumulative time.
+    """
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=ROOT, capture_output=True, text=True, check=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        # Two spaces of indentation per nesting level
+        rows.append((int(cumulative_us), (len(name) - len(name.lstrip()) - 1) // 2, name.strip()))
+
+    # Children are listed before their parent, one level deeper
+    root_index = next(i for i, row in enumerate(rows) if row[2] == module)
+    root_depth = rows[root_index][1]
+    children = []
+    for cumulative_us, depth, name in reversed(rows[:root_index]):
+        if depth <= root_depth:
+            break
+        if depth == root_depth + 1:
+            children.append((cumulative_us, name))
+    return sorted(children, reverse=True)[:limit]
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _wait_for(url: str, timeout: float, body: bytes = None) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            req = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"} if body else {})
+            with urllib.request.urlopen(req, timeout=timeout) as resp:
+                if resp.status < 500:
+                    return
+        except OSError:
+            time.sleep(0.01)
+    raise TimeoutError(f"No response from {url}")
+
+def measure_first_response(env: dict, site_url: str) -> dict:
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env
+    )
+    try:
+        _wait_for(f"{base}/", timeout=60)
+        ready = time.perf_counter()
+        body = json.dumps({
+            "project_url": site_url,
+            "project_type": "Token",
+            "wallet_address": "0xbench",
+            "request_mode": "pre_check",
+        }).encode()
+        _wait_for(f"{base}/analyze", timeout=60, body=body)
+        first = time.perf_counter()
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+    return {"root_ms": (ready - started) * 1000, "first_analyze_ms": (first - started) * 1000}
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="Slowest imports to list")
+    parser.add_argument("--warmup", action="store_true", help="Start the server with WARMUP=1")
+    args = parser.parse_args()
+
+    imports = [measure_import() for _ in range(args.runs)]
+    print(f"import app.main: median {statistics.median(imports):.1f} ms (min {min(imports):.1f}, max {max(imports):.1f})")
+    for us, name in slowest_imports(args.top):
+        print(f"   {us / 1000:8.1f} ms  {name}")
+
+    fleet = StubFleet().start()
+    try:
+        workdir = tempfile.mkdtemp(prefix="aptoseidon-startup-")
+        env = dict(os.environ, **fleet.env())
+        env["APTOSEIDON_DB_PATH"] = os.path.join(workdir, "bench.db")
+        env["CACHE_DB_PATH"] = os.path.join(workdir, "cache.db")
+        env["WARMUP"] = "1" if args.warmup else "0"
+        runs = [measure_first_response(env, fleet.site_url(f"startup-{i}")) for i in range(args.runs)]
+    finally:
+        fleet.stop()
+
+    roots = [r["root_ms"] for r in runs]
+    firsts = [r["first_analyze_ms"] for r in runs]
+    print(f"time to first GET /:      median {statistics.median(roots):.1f} ms")
+    print(f"time to first /analyze:   median {statistics.median(firsts):.1f} ms (warmup={'on' if args.warmup else 'off'})")
+
+if __name__ == "__main__":
+    sys.exit(main())
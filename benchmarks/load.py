@@ -0,0 +1,233 @@
+"""
+Offline load and latency benchmark for /analyze.
+
+Starts the upstream stubs, points the app at them (in-process over ASGI by
+default, or an already running server via --target) and drives each request
+path with a fixed-concurrency load generator:
+
+    python -m benchmarks.load --requests 200 --concurrency 16 --latency openai=300
+    python -m benchmarks.load --label after --compare benchmarks/results/before.json
+
+Per-stage timings come from the Server-Timing header set by the app.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks.stubs import StubFleet, add_stub_arguments, build_configs
+
+SCENARIOS = ["pre_check", "evidence_only", "paid", "cache_hit"]
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+def percentile(values: List[float], pct: float) -> float:
+    """
+    Nearest-rank percentile (0 for empty input).
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100 * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    return {
+        "mean": statistics.fmean(latencies) if latencies else 0.0,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "max": max(latencies) if latencies else 0.0,
+    }
+
+class Scenario:
+    """
+    Builds the request body for one /analyze path.
+    """
+    def __init__(self, name: str, fleet: StubFleet, project_type: str):
+        self.name = name
+        self.fleet = fleet
+        self.project_type = project_type
+        self.cache_slug = f"cached-{uuid.uuid4().hex[:6]}"
+
+    def payload(self) -> dict:
+        # Unique URLs keep the non-cache paths cold; cache_hit reuses one URL
+        slug = self.cache_slug if self.name == "cache_hit" else uuid.uuid4().hex[:10]
+        body = {
+            "project_url": self.fleet.site_url(slug),
+            "project_type": self.project_type,
+            "wallet_address": "0xbench",
+            "request_mode": "full",
+            "evidence_only": False,
+        }
+        if self.name == "pre_check":
+            body["request_mode"] = "pre_check"
+        elif self.name == "evidence_only":
+            body["evidence_only"] = True
+        else:
+            body["payment_tx_hash"] = f"0x{uuid.uuid4().hex}"
+        return body
+
+async def run_scenario(client: httpx.AsyncClient, scenario: Scenario, total: int, concurrency: int) -> dict:
+    latencies: List[float] = []
+    stage_samples: Dict[str, List[float]] = {}
+    statuses: Dict[str, int] = {}
+
+    if scenario.name == "cache_hit":
+        # Warm the cache with one paid request before measuring
+        await client.post("/analyze", json=scenario.payload())
+
+    queue: asyncio.Queue = asyncio.Queue()
+    for _ in range(total):
+        queue.put_nowait(scenario.payload())
+
+    async def worker():
+        from app.utils.timing import parse_server_timing
+        while True:
+            try:
+                body = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            start = time.perf_counter()
+            try:
+                resp = await client.post("/analyze", json=body)
+                status = str(resp.status_code)
+                stages = parse_server_timing(resp.headers.get("server-timing", ""))
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+                stages = {}
+            latencies.append((time.perf_counter() - start) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+            for name, dur in stages.items():
+                stage_samples.setdefault(name, []).append(dur)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    ok = sum(count for status, count in statuses.items() if status.startswith("2"))
+    return {
+        "requests": total,
+        "ok": ok,
+        "statuses": statuses,
+        "elapsed_s": elapsed,
+        "throughput_rps": total / elapsed if elapsed else 0.0,
+        "latency_ms": summarize(latencies),
+        "stages_ms": {
+            name: {"mean": statistics.fmean(samples), "p95": percentile(samples, 95), "count": len(samples)}
+            for name, samples in sorted(stage_samples.items())
+        },
+    }
+
+def make_client(target: Optional[str]) -> httpx.AsyncClient:
+    if target:
+        return httpx.AsyncClient(base_url=target, timeout=120.0)
+
+    from app.main import app
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=120.0)
+
+@asynccontextmanager
+async def app_lifespan(target: Optional[str]):
+    # ASGITransport does not send lifespan events; run startup/shutdown ourselves
+    if target:
+        yield
+        return
+    from app.main import app
+    async with app.router.lifespan_context(app):
+        yield
+
+async def run(args) -> dict:
+    fleet = StubFleet(build_configs(args.latency, args.jitter, args.error_rate), seed=args.seed).start()
+    try:
+        # The app reads upstream URLs at import, so route it to the stubs first
+        os.environ.update(fleet.env())
+        if not args.target:
+            workdir = tempfile.mkdtemp(prefix="aptoseidon-bench-")
+            os.environ.setdefault("APTOSEIDON_DB_PATH", os.path.join(workdir, "bench.db"))
+            os.environ.setdefault("CACHE_DB_PATH", os.path.join(workdir, "cache.db"))
+
+        results = {}
+        async with app_lifespan(args.target), make_client(args.target) as client:
+            for name in args.scenario or SCENARIOS:
+                scenario = Scenario(name, fleet, args.project_type)
+                results[name] = await run_scenario(client, scenario, args.requests, args.concurrency)
+                print_scenario(name, results[name])
+
+        return {
+            "label": args.label,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "config": {
+                "requests": args.requests,
+                "concurrency": args.concurrency,
+                "project_type": args.project_type,
+                "target": args.target or "asgi",
+                "latency": args.latency or [],
+                "jitter": args.jitter or [],
+                "error_rate": args.error_rate or [],
+            },
+            "upstream_calls": fleet.stats(),
+            "scenarios": results,
+        }
+    finally:
+        fleet.stop()
+
+# --- Reporting ---
+
+def print_scenario(name: str, res: dict):
+    lat = res["latency_ms"]
+    print(f"\n== {name}: {res['ok']}/{res['requests']} ok, {res['throughput_rps']:.1f} req/s, statuses={res['statuses']}")
+    print(f"   latency ms  p50={lat['p50']:.1f}  p95={lat['p95']:.1f}  p99={lat['p99']:.1f}  max={lat['max']:.1f}")
+    for stage, st in res["stages_ms"].items():
+        print(f"   {stage:<14} mean={st['mean']:8.2f}  p95={st['p95']:8.2f}  n={st['count']}")
+
+def compare(baseline: dict, current: dict):
+    print(f"\n== compare: {baseline.get('label')} -> {current.get('label')}")
+    for name, cur in current["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if not base:
+            continue
+        print(f"   {name}")
+        rows = [("throughput_rps", base["throughput_rps"], cur["throughput_rps"])]
+        rows += [(f"latency {p}", base["latency_ms"][p], cur["latency_ms"][p]) for p in ("p50", "p95", "p99")]
+        for label, old, new in rows:
+            delta = ((new - old) / old * 100) if old else 0.0
+            print(f"      {label:<15} {old:10.2f} -> {new:10.2f}  ({delta:+.1f}%)")
+
+def save(result: dict, path: Optional[str]) -> str:
+    if not path:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(RESULTS_DIR, f"{stamp}-{result['label']}.json")
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2)
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load benchmark for /analyze")
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS, help="Path to exercise (repeatable, default all)")
+    parser.add_argument("--requests", type=int, default=100, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--project-type", default="DeFi", help="'DeFi' exercises the LLM agents; 'Token' adds CoinGecko")
+    parser.add_argument("--target", help="Base URL of a running server (default: in-process ASGI)")
+    parser.add_argument("--label", default="run")
+    parser.add_argument("--output", help="Where to save the JSON result (default benchmarks/results/)")
+    parser.add_argument("--compare", help="Previous result JSON to diff against")
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    print(f"\nSaved {save(result, args.output)}")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), result)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,333 @@
+"""
+Local stub servers for every upstream the backend talks to.
+
+Each stub runs on its own port with configurable latency and error rate so the
+load generator can exercise /analyze fully offline:
+
+    python -m benchmarks.stubs --latency openai=400 --error-rate coingecko=0.05
+
+prints the environment needed to point a separately started server at them.
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+# Mirrors app.utils.x402.PAYMENT_RECIPIENT (kept literal so stubs never import the app)
+PAYMENT_RECIPIENT = "0x701b1d24270dd314d417430fbc2fc5407c4119aa7a94bc3d467d94952f9bc6cc"
+
+UPSTREAMS = ["site", "coingecko", "aptos_node", "aptos_tx", "openai", "search"]
+
+@dataclass
+class StubConfig:
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+
+@dataclass
+class StubStats:
+    requests: int = 0
+    errors: int = 0
+    in_flight: int = 0
+    max_in_flight: int = 0 # Peak concurrent requests (checks crawler politeness)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+def _json(status: int, payload) -> Tuple[int, str, bytes]:
+    return status, "application/json", json.dumps(payload).encode()
+
+# --- Upstream behaviour ---
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "site")
+FIXTURE_PAGES = {"docs": "docs.html", "whitepaper": "whitepaper.html", "audits": "audit.html"}
+
+LANDING_PAGE = """<html><head><title>{name}</title></head>
+<body>
+<nav><a href="/">Home</a> <a href="/p/{slug}/docs">Docs</a> <a href="/p/{slug}/whitepaper">Whitepaper</a></nav>
+<h1>{name}</h1>
+<p>{name} is a decentralized liquidity protocol on Aptos with audited Move modules.</p>
+<p>Read the docs and the whitepaper for tokenomics and the vesting schedule.</p>
+<footer><a href="/p/{slug}/audits">Audits</a> <a href="https://github.com/bench/{slug}">GitHub</a> Copyright {name}</footer>
+</body></html>"""
+
+def site_route(method: str, query: dict, body: bytes, path: str = "/"):
+    parts = path.strip("/").split("/")
+    # /gh/repos/<owner>/<repo> stands in for the GitHub API (GITHUB_API_URL)
+    if parts[0] == "gh" and len(parts) >= 4:
+        return _json(200, {
+            "full_name": f"{parts[2]}/{parts[3]}",
+            "stargazers_count": 42,
+            "archived": False,
+            "pushed_at": "2026-01-15T10:00:00Z",
+        })
+    # /p/<slug>/<page> serves the static docs fixture
+    if len(parts) >= 3 and parts[-1] in FIXTURE_PAGES:
+        with open(os.path.join(FIXTURE_DIR, FIXTURE_PAGES[parts[-1]]), "rb") as f:
+            return 200, "text/html", f.read()
+    if len(parts) >= 3:
+        return 404, "text/html", b"<html><body>Not found</body></html>"
+    slug = parts[-1] or "project"
+    return 200, "text/html", LANDING_PAGE.format(name="Bench " + slug, slug=slug).encode()
+
+def coingecko_route(method: str, query: dict, body: bytes, path: str = "/"):
+    if path.endswith("/search"):
+        return _json(200, {"coins": [{"id": "bench-coin", "symbol": "bnch"}]})
+    if "/coins/" in path:
+        return _json(200, {
+            "id": "bench-coin",
+            "symbol": "bnch",
+            "market_data": {
+                "current_price": {"usd": 1.23},
+                "market_cap": {"usd": 120_000_000},
+                "total_volume": {"usd": 9_500_000},
+                "price_change_percentage_24h": -1.7,
+                "ath": {"usd": 4.2},
+                "atl": {"usd": 0.11},
+                "fully_diluted_valuation": {"usd": 300_000_000},
+                "total_supply": 250_000_000,
+                "circulating_supply": 100_000_000,
+            },
+        })
+    return _json(404, {"error": "not found"})
+
+def aptos_node_route(method: str, query: dict, body: bytes, path: str = "/"):
+    if path.endswith("/resources"):
+        return _json(200, [
+            {"type": "0x1::account::Account"},
+            {"type": "0xbeef::pool::LiquidityPool"},
+            {"type": "0xbeef::token::Config"},
+        ])
+    return _json(404, {"error": "not found"})
+
+def aptos_tx_route(method: str, query: dict, body: bytes, path: str = "/"):
+    if "/transactions/by_hash/" in path:
+        return _json(200, {
+            "hash": path.rsplit("/", 1)[-1],
+            "success": True,
+            "payload": {
+                "function": "0x1::aptos_account::transfer",
+                "arguments": [PAYMENT_RECIPIENT, "1000000"],
+            },
+        })
+    return _json(404, {"error": "not found"})
+
+def openai_route(method: str, query: dict, body: bytes, path: str = "/"):
+    try:
+        req = json.loads(body or b"{}")
+    except ValueError:
+        req = {}
+    if req.get("response_format", {}).get("type") == "json_object":
+        # One payload satisfies every JSON agent (risk, credibility, contradiction)
+        content = json.dumps({
+            "risk_score": 0.35,
+            "risk_flags": ["Team partially anonymous"],
+            "credibility_score": 0.7,
+            "positive_signals": ["Documentation published"],
+            "has_conflict": False,
+            "reason": "",
+        })
+    else:
+        content = "Liquidity is moderate relative to market cap. Documentation is present. No structural anomalies detected."
+    return _json(200, {
+        "id": "chatcmpl-bench",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": req.get("model", "gpt-4o-mini"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {"prompt_tokens": 100, "completion_tokens": 50, "total_tokens": 150},
+    })
+
+def search_route(method: str, query: dict, body: bytes, path: str = "/"):
+    term = (query.get("q") or [""])[0]
+    num = int((query.get("num") or ["5"])[0])
+    slug = term.split(" ")[0].lower() or "project"
+    results = [f"https://www.reddit.com/r/aptos/{slug}-{i}" for i in range(num)]
+    return _json(200, {"results": results})
+
+ROUTES: Dict[str, Callable] = {
+    "site": site_route,
+    "coingecko": coingecko_route,
+    "aptos_node": aptos_node_route,
+    "aptos_tx": aptos_tx_route,
+    "openai": openai_route,
+    "search": search_route,
+}
+
+# --- Server plumbing ---
+
+class StubServer:
+    """
+    A threaded HTTP server serving one upstream with injected latency/errors.
+    """
+    def __init__(self, name: str, config: Optional[StubConfig] = None, seed: int = 0):
+        self.name = name
+        self.config = config or StubConfig()
+        self.stats = StubStats()
+        self._route = ROUTES[name]
+        self._rng = random.Random(f"{seed}:{name}")
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes; without TCP_NODELAY, Nagle plus
+            # delayed ACK adds ~40 ms to every keep-alive request
+            disable_nagle_algorithm = True
+
+            def _serve(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                parsed = urlparse(self.path)
+                status, ctype, payload = stub.handle(self.command, parsed.path, parse_qs(parsed.query), body)
+                self.send_response(status)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = _serve
+            do_POST = _serve
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def handle(self, method: str, path: str, query: dict, body: bytes):
+        cfg = self.config
+        with self.stats.lock:
+            self.stats.requests += 1
+            delay = cfg.latency_ms + (self._rng.uniform(0, cfg.jitter_ms) if cfg.jitter_ms else 0)
+            fail = cfg.error_rate > 0 and self._rng.random() < cfg.error_rate
+            if fail:
+                self.stats.errors += 1
+            self.stats.in_flight += 1
+            self.stats.max_in_flight = max(self.stats.max_in_flight, self.stats.in_flight)
+        try:
+            if delay:
+                time.sleep(delay / 1000)
+            if fail:
+                return _json(500, {"error": "injected failure"})
+            return self._route(method, query, body, path=path)
+        finally:
+            with self.stats.lock:
+                self.stats.in_flight -= 1
+
+    def start(self) -> "StubServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name=f"stub-{self.name}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+class StubFleet:
+    """
+    All upstream stubs plus the environment that routes the app to them.
+    """
+    def __init__(self, configs: Optional[Dict[str, StubConfig]] = None, seed: int = 0):
+        configs = configs or {}
+        self.servers = {name: StubServer(name, configs.get(name), seed=seed) for name in UPSTREAMS}
+
+    def start(self) -> "StubFleet":
+        for server in self.servers.values():
+            server.start()
+        return self
+
+    def stop(self):
+        for server in self.servers.values():
+            server.stop()
+
+    def env(self) -> Dict[str, str]:
+        s = self.servers
+        return {
+            "COINGECKO_API_URL": s["coingecko"].url,
+            "APTOS_NODE_URL": s["aptos_node"].url,
+            "APTOS_TESTNET_URL": s["aptos_tx"].url,
+            "OPENAI_BASE_URL": f"{s['openai'].url}/v1",
+            "OPENAI_API_KEY": "bench",
+            "SEARCH_API_URL": f"{s['search'].url}/search",
+            "GITHUB_API_URL": f"{s['site'].url}/gh",
+            "CRAWL_ALLOW_PRIVATE": "1", # The stub site is on 127.0.0.1
+        }
+
+    def site_url(self, slug: str) -> str:
+        return f"{self.servers['site'].url}/p/{slug}"
+
+    def reset_peaks(self):
+        # Starts a new max_in_flight measurement (e.g. for one phase of a benchmark)
+        for server in self.servers.values():
+            with server.stats.lock:
+                server.stats.max_in_flight = server.stats.in_flight
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            name: {"requests": srv.stats.requests, "errors": srv.stats.errors, "max_in_flight": srv.stats.max_in_flight}
+            for name, srv in self.servers.items()
+        }
+
+def parse_overrides(pairs, cast=float) -> Dict[str, float]:
+    """
+    Parses ["openai=400", "all=20"] into {"openai": 400.0, ...}; "all" fans out.
+    """
+    values: Dict[str, float] = {}
+    for pair in pairs or []:
+        name, _, raw = pair.partition("=")
+        if name == "all":
+            for upstream in UPSTREAMS:
+                values.setdefault(upstream, cast(raw))
+        elif name in UPSTREAMS:
+            values[name] = cast(raw)
+        else:
+            raise SystemExit(f"Unknown upstream '{name}' (expected one of {', '.join(UPSTREAMS)} or all)")
+    return values
+
+def build_configs(latency=None, jitter=None, error_rate=None) -> Dict[str, StubConfig]:
+    lat, jit, err = parse_overrides(latency), parse_overrides(jitter), parse_overrides(error_rate)
+    return {
+        name: StubConfig(latency_ms=lat.get(name, 0.0), jitter_ms=jit.get(name, 0.0), error_rate=err.get(name, 0.0))
+        for name in UPSTREAMS
+    }
+
+def add_stub_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--latency", action="append", metavar="UPSTREAM=MS", help="Base latency per upstream (repeatable, 'all' allowed)")
+    parser.add_argument("--jitter", action="append", metavar="UPSTREAM=MS", help="Uniform extra latency per upstream")
+    parser.add_argument("--error-rate", action="append", metavar="UPSTREAM=P", help="Probability of HTTP 500 per upstream")
+    parser.add_argument("--seed", type=int, default=0)
+
+def main():
+    parser = argparse.ArgumentParser(description="Run upstream stubs for Aptoseidon benchmarks")
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    fleet = StubFleet(build_configs(args.latency, args.jitter, args.error_rate), seed=args.seed).start()
+    for key, value in fleet.env().items():
+        print(f"export {key}={value}")
+    print(f"# landing pages: {fleet.site_url('<slug>')}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        fleet.stop()
+
+if __name__ == "__main__":
+    main()